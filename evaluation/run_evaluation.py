@@ -1,8 +1,10 @@
 import sys
 import os
 import json
+import argparse
 import time
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Optional
 
 # Path setup to import research_agent
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -10,90 +12,220 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from research_agent.utils import LLMClient, setup_logger
 from research_agent.planner import Planner
 from research_agent.executor import Executor
+from research_agent.finalize import Finalizer
 from research_agent.synthesizer import Synthesizer
 from research_agent.verifier import Verifier
+from research_agent.gate import should_bypass
 from research_agent.schema import ExecutionMode, FinalOutcome
 
 logger = setup_logger("evaluation_runner")
 
-def run_evaluation():
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+CHECKPOINT_PATH = os.path.join(RESULTS_DIR, "latest_run.jsonl")
+# EVAL_BATCH_VERIFY=1 sends every audit through the provider's Batch API after all runs
+# finish: half the cost and off the sync rate limit, but records land only once the batch does
+BATCH_VERIFY = os.getenv("EVAL_BATCH_VERIFY") == "1"
+
+def load_completed(checkpoint_path: str) -> set:
+    """Returns the (prompt_id, mode) keys already recorded without error."""
+    done = set()
+    if not os.path.exists(checkpoint_path):
+        return done
+    with open(checkpoint_path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue # Partial line from an interrupted write
+            if "error" not in record:
+                done.add((record["prompt_id"], record["mode"]))
+    return done
+
+def truncate_partial_line(checkpoint_path: str):
+    """Drops a trailing line torn by an interrupted write, so the next append starts on a fresh line."""
+    if not os.path.exists(checkpoint_path):
+        return
+    with open(checkpoint_path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        # Scan backward in blocks; only the torn tail is read, not the whole checkpoint
+        while pos > 0:
+            start = max(0, pos - 4096)
+            f.seek(start)
+            block = f.read(pos - start)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                pos = start + newline + 1
+                break
+            pos = start
+        if pos != end:
+            f.truncate(pos)
+
+def run_evaluation(fresh: bool = False):
     prompts_path = os.path.join(os.path.dirname(__file__), "prompts.json")
     with open(prompts_path, "r") as f:
         prompts = json.load(f)
 
-    results = []
-    
-    # Init components
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    if fresh and os.path.exists(CHECKPOINT_PATH):
+        os.remove(CHECKPOINT_PATH)
+    truncate_partial_line(CHECKPOINT_PATH)
+    done = load_completed(CHECKPOINT_PATH)
+
+    # Init components; the client's connection pool is reused across every run
     client = LLMClient(provider="auto")
     planner = Planner(client)
     # We will instantiate Executor per run to reset state cleanly/set mode
+    finalizer = Finalizer(client)
     synthesizer = Synthesizer(client)
     verifier = Verifier(client)
+    pending_audits = [] # (result_record, (plan, execution_log, synthesis)) when BATCH_VERIFY
 
     modes = [ExecutionMode.NORMAL, ExecutionMode.STRESS_TEST]
 
+    tasks = [(p, m) for p in prompts for m in modes if (p["id"], m.value) not in done]
+
     print(f"Starting evaluation on {len(prompts)} prompts x {len(modes)} modes...")
+    if done:
+        print(f"Resuming from checkpoint: {len(done)} runs already complete, {len(tasks)} remaining.")
+
+    # Trivial/malformed queries are served by the gate without any LLM calls
+    bypass = {p["id"]: should_bypass(p["query"]) for p in prompts}
+
+    # Plans do not depend on the execution mode, so precompute all of them
+    # in one batch up front instead of one request per prompt per mode.
+    pending_prompts = list({p["id"]: p for p, _ in tasks if bypass[p["id"]] is None}.values())
+    plans = dict(zip(
+        (p["id"] for p in pending_prompts),
+        planner.plan_many([p["query"] for p in pending_prompts])
+    ))
+
+    def report(result_record: Dict, line: str):
+        # Runs finish concurrently, so each reports in one self-identifying print
+        print(f"PROMPT {result_record['prompt_id']} [{result_record['mode']}]: {line}")
+
+    def record_verification(result_record: Dict, verification):
+        result_record["verification_status"] = verification.status
+        result_record["final_outcome"] = verification.final_outcome.value
+        result_record["confidence_adjustment"] = verification.confidence_adjustment
+        result_record["abstention_reason"] = verification.abstention_reason
+        
+        line = f"Outcome: {verification.final_outcome.value} | Status: {verification.status}"
+        if verification.final_outcome == FinalOutcome.ABSTAINED:
+            line += f" | Reason: {verification.abstention_reason}"
+        report(result_record, line)
+
+    def run_one(prompt_data: Dict, mode: ExecutionMode) -> Optional[Dict]:
+        """Returns the run's record, or None if its audit is deferred to the offline batch."""
+        query = prompt_data["query"]
+        result_record = {
+            "prompt_id": prompt_data["id"],
+            "category": prompt_data["category"],
+            "mode": mode.value,
+            "query": query,
+            "timestamp": time.time(),
+            "plan_steps": 0,
+            "verification_status": "N/A",
+            "final_outcome": "N/A",
+            "confidence_adjustment": "N/A"
+        }
+
+        decision = bypass[prompt_data["id"]]
+        if decision:
+            result_record["verification_status"] = "bypassed"
+            result_record["final_outcome"] = decision.final_outcome.value
+            result_record["confidence_adjustment"] = "none"
+            result_record["abstention_reason"] = decision.reason if decision.final_outcome == FinalOutcome.ABSTAINED else None
+            result_record["answer"] = decision.answer
+            report(result_record, f"Outcome: {decision.final_outcome.value} | Gate: {decision.reason}")
+            return result_record
 
-    for prompt_data in prompts:
-        for mode in modes:
-            query = prompt_data["query"]
-            result_record = {
-                "prompt_id": prompt_data["id"],
-                "category": prompt_data["category"],
-                "mode": mode.value,
-                "query": query,
-                "timestamp": time.time(),
-                "plan_steps": 0,
-                "verification_status": "N/A",
-                "final_outcome": "N/A",
-                "confidence_adjustment": "N/A"
-            }
-
-            print(f"\n--- PROMPT {prompt_data['id']} [{mode.value}]: {query} ---")
+        try:
+            # 1. Plan
+            plan = plans[prompt_data["id"]]
+            if not plan:
+                result_record["error"] = "Planning Failed"
+                return result_record
             
-            try:
-                # 1. Plan
-                plan = planner.plan(query)
-                if not plan:
-                    result_record["error"] = "Planning Failed"
-                    results.append(result_record)
-                    continue
-                
-                result_record["plan_steps"] = len(plan.steps)
-                
-                # 2. Execute
-                executor = Executor(client) # Fresh instance
-                executor.set_mode(mode)
-                execution_log = executor.run(plan)
-                
-                # 3. Synthesize
+            result_record["plan_steps"] = len(plan.steps)
+            
+            # 2. Execute
+            executor = Executor(client) # Fresh instance
+            executor.set_mode(mode)
+            execution_log = executor.run(plan)
+            
+            if BATCH_VERIFY:
+                # 3. Synthesize now; 4. verification is submitted with every other run's audit
                 synthesis = synthesizer.synthesize(execution_log, query)
-                
-                # 4. Verify
-                verification = verifier.verify(plan, execution_log, synthesis)
-                
-                result_record["verification_status"] = verification.status
-                result_record["final_outcome"] = verification.final_outcome.value
-                result_record["confidence_adjustment"] = verification.confidence_adjustment
-                result_record["abstention_reason"] = verification.abstention_reason
-                
-                print(f"Outcome: {verification.final_outcome.value} | Status: {verification.status}")
-                if verification.final_outcome == FinalOutcome.ABSTAINED:
-                    print(f"Reason: {verification.abstention_reason}")
+                pending_audits.append((result_record, (plan, execution_log, synthesis)))
+                return None
+
+            # 3 + 4. Synthesize and verify in a single LLM call
+            synthesis, verification = finalizer.finalize(execution_log, plan, query)
+            record_verification(result_record, verification)
+
+        except Exception as e:
+            logger.error("Run failed: %s", e)
+            result_record["error"] = str(e)
+        
+        return result_record
 
+    # Runs are dominated by LLM latency, so a thread pool overlaps them.
+    # LLMClient's concurrency_limit keeps provider QPS in check.
+    # Each record is appended and fsynced as soon as its run completes, so an
+    # interrupted sweep resumes where it left off.
+    with client, open(CHECKPOINT_PATH, "a") as checkpoint, \
+            ThreadPoolExecutor(max_workers=int(os.getenv("EVAL_CONCURRENCY", 16))) as ex:
+        def save(record: Dict):
+            checkpoint.write(json.dumps(record) + "\n")
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+
+        futures = [ex.submit(run_one, p, m) for p, m in tasks]
+        for future in as_completed(futures):
+            record = future.result()
+            if record is not None:
+                save(record)
+
+        if pending_audits:
+            print(f"\nVerifying {len(pending_audits)} runs through the Batch API...")
+            try:
+                verifications = verifier.verify_offline([item for _, item in pending_audits])
             except Exception as e:
-                logger.error(f"Run failed: {e}")
-                result_record["error"] = str(e)
-            
-            results.append(result_record)
+                logger.error("Batch verification failed: %s", e)
+                verifications = [None] * len(pending_audits)
+            for (record, _), verification in zip(pending_audits, verifications):
+                if verification is None:
+                    record["error"] = "Batch verification failed"
+                else:
+                    record_verification(record, verification)
+                save(record)
+
+    # Aggregate the checkpoint into latest_run.json (latest record per run wins),
+    # kept in prompt/mode order regardless of completion order
+    results = {}
+    with open(CHECKPOINT_PATH, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue # Partial line from an interrupted write
+            results[(record["prompt_id"], record["mode"])] = record
+    mode_order = {m.value: i for i, m in enumerate(modes)}
+    ordered = sorted(results.values(), key=lambda r: (r["prompt_id"], mode_order.get(r["mode"], len(modes))))
 
-    # Save results
-    os.makedirs(os.path.join(os.path.dirname(__file__), "results"), exist_ok=True)
-    output_path = os.path.join(os.path.dirname(__file__), "results", "latest_run.json")
+    output_path = os.path.join(RESULTS_DIR, "latest_run.json")
     with open(output_path, "w") as f:
-        json.dump(results, f, indent=2)
+        json.dump(ordered, f, indent=2)
         
     print(f"\nEvaluation complete. Results saved to {output_path}")
 
 if __name__ == "__main__":
-    run_evaluation()
+    parser = argparse.ArgumentParser(description="Run the adversarial evaluation sweep.")
+    parser.add_argument("--fresh", action="store_true", help="Discard the checkpoint and rerun every prompt")
+    args = parser.parse_args()
+    run_evaluation(fresh=args.fresh)
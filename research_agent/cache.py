@@ -0,0 +1,106 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+from .utils import setup_logger
+from .semantic_cache import SemanticCache
+
+logger = setup_logger("llm_cache")
+
+DEFAULT_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", ".llm_cache.sqlite3")
+CACHE_FILENAME = "responses.sqlite3" # Inside LLM_CACHE_DIR, when set
+DEFAULT_TTL = 86400 # Seconds before a cached response is treated as stale
+
+class DiskCache:
+    """
+    Two-tier on-disk cache for LLM responses, backed by sqlite3.
+
+    1. Exact: BLAKE2b(namespace + system_prompt + user_prompt) -> response.
+    2. Semantic (opt-in): nearest stored user prompt for the same namespace and
+       system prompt, returned when cosine similarity >= threshold.
+
+    The namespace is the provider name, so responses never leak between providers.
+    Entries older than `ttl` seconds are ignored and overwritten on the next put.
+    """
+
+    def __init__(self, path: Optional[str] = None, namespace: str = "", semantic: bool = False,
+                 threshold: float = 0.97, ttl: float = DEFAULT_TTL):
+        if path is None:
+            cache_dir = os.environ.get("LLM_CACHE_DIR")
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+                path = os.path.join(cache_dir, CACHE_FILENAME)
+            else:
+                path = DEFAULT_CACHE_PATH
+        self.path = path
+        self.namespace = namespace
+        self.threshold = threshold
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key BLOB PRIMARY KEY, scope BLOB, embedding BLOB, response TEXT, ts REAL)"
+        )
+        self._conn.commit()
+
+        self._semantic = None
+        if semantic:
+            self._init_semantic()
+
+    def _key(self, system_prompt: str, user_prompt: str) -> bytes:
+        data = "\x1f".join((self.namespace, system_prompt, user_prompt)).encode()
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def _scope(self, system_prompt: str) -> bytes:
+        # Semantic hits are only valid between prompts sent to the same provider and role.
+        return hashlib.blake2b((self.namespace + "\x1f" + system_prompt).encode(), digest_size=16).digest()
+
+    def _init_semantic(self):
+        semantic = SemanticCache(threshold=self.threshold, ttl=self.ttl)
+        if not semantic.enabled:
+            return
+        self._semantic = semantic
+
+        import numpy as np # Installed with sentence-transformers
+        rows = self._conn.execute(
+            "SELECT key, scope, embedding, response, ts FROM responses WHERE embedding IS NOT NULL AND ts >= ?",
+            (time.time() - self.ttl,)
+        ).fetchall()
+        for key, scope, embedding, response, ts in rows:
+            semantic.add(None, response, scope=scope, vector=np.frombuffer(embedding, dtype=np.float32), key=key, ts=ts)
+        logger.info("Semantic cache loaded with %s entries", len(rows))
+
+    def get(self, system_prompt: str, user_prompt: str) -> Optional[str]:
+        key = self._key(system_prompt, user_prompt)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND ts >= ?", (key, time.time() - self.ttl)
+            ).fetchone()
+        if row:
+            return row[0]
+
+        if self._semantic is None:
+            return None
+        return self._semantic.query(user_prompt, scope=self._scope(system_prompt))
+
+    def put(self, system_prompt: str, user_prompt: str, response: str):
+        key = self._key(system_prompt, user_prompt)
+        scope = self._scope(system_prompt)
+        vector = embedding = None
+        if self._semantic is not None:
+            vector = self._semantic.embed(user_prompt)
+            embedding = vector.tobytes()
+
+        ts = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, scope, embedding, response, ts) VALUES (?, ?, ?, ?, ?)",
+                (key, scope, embedding, response, ts)
+            )
+            self._conn.commit()
+        if vector is not None:
+            # Same key as the sqlite row, so a replaced response replaces its in-memory entry too
+            self._semantic.add(user_prompt, response, scope=scope, vector=vector, key=key, ts=ts)
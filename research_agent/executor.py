@@ -1,18 +1,30 @@
 import time
-from typing import List, Dict, Any, Optional
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque
+from typing import List, Dict, Any, Callable, Iterator, Optional, Set, Tuple
 from .schema import (
     ResearchPlan, ResearchStep, ResearchOutput, ComparisonOutput, 
     ResearchInput, ComparisonInput, ExecutionMode
 )
-from .tools import execute_research, execute_compare
+from .tools import (
+    execute_research, execute_compare, build_compare_prompt, parse_compare_response, COMPARE_SYSTEM_PROMPT
+)
 from .utils import setup_logger, LLMClient
+from .json_utils import dumps_json_bytes
 
 logger = setup_logger("executor")
 
+def _serialize_artifact(output: Any) -> Optional[bytes]:
+    return dumps_json_bytes(output.to_compact()) if hasattr(output, "to_compact") else None
+
 class ExecutionLog:
     def __init__(self):
         self.log: List[Dict[str, Any]] = []
         self.artifacts: Dict[int, Any] = {} # Step ID -> Output Object
+        self.artifact_bytes: Dict[int, bytes] = {} # Step ID -> compact JSON, serialized once at insertion
+        self._lock = threading.Lock() # Steps may complete concurrently
 
     def add_entry(self, step_id: int, status: str, output: Any = None, error: str = None):
         entry = {
@@ -22,37 +34,99 @@ class ExecutionLog:
             "output": output if status == "success" else None,
             "error": error
         }
-        self.log.append(entry)
-        if output:
-            self.artifacts[step_id] = output
+        # Serialize the prompt projection once here rather than on every downstream read
+        blob = _serialize_artifact(output)
+        with self._lock:
+            self.log.append(entry)
+            if output:
+                self.artifacts[step_id] = output
+            if blob is not None:
+                self.artifact_bytes[step_id] = blob
+
+    def snapshot(self) -> "ExecutionLog":
+        """A point-in-time copy that stays consistent while further steps complete."""
+        snap = ExecutionLog()
+        with self._lock:
+            snap.log = list(self.log)
+            snap.artifacts = dict(self.artifacts)
+            snap.artifact_bytes = dict(self.artifact_bytes)
+        return snap
+
+    def serialized_artifacts(self) -> Dict[int, bytes]:
+        """Step ID -> compact JSON of each serializable artifact, copied under the lock."""
+        with self._lock:
+            return dict(self.artifact_bytes)
 
 class Executor:
-    def __init__(self, llm_client: LLMClient):
+    def __init__(self, llm_client: LLMClient, max_workers: int = 4):
         self.execution_log = ExecutionLog()
         self.llm_client = llm_client
         self.mode = ExecutionMode.NORMAL
+        self.max_workers = max_workers
 
     def set_mode(self, mode: ExecutionMode):
         self.mode = mode
 
-    def validate_plan(self, plan: ResearchPlan) -> bool:
-        seen_ids = set()
+    def validate_plan(self, plan: ResearchPlan) -> Tuple[bool, List[ResearchStep], Dict[int, Set[int]]]:
+        """
+        Validates the plan and topologically sorts it in one pass (Kahn's algorithm).
+        Returns (ok, order, deps): order is a valid execution order and deps maps
+        Step ID -> IDs it must wait for. Rejects duplicate IDs, unknown inputs and cycles.
+        """
+        steps_by_id: Dict[int, ResearchStep] = {}
+        for step in plan.steps:
+            if step.id in steps_by_id:
+                logger.error("Duplicate Step ID found: %s", step.id)
+                return False, [], {}
+            steps_by_id[step.id] = step
+
         for step in plan.steps:
-            if step.id in seen_ids:
-                logger.error(f"Duplicate Step ID found: {step.id}")
-                return False
-            
-            if step.inputs:
-                for input_id in step.inputs:
-                    if input_id not in seen_ids:
-                        logger.error(f"Step {step.id} depends on future or non-existent Step {input_id}")
-                        return False
-            
-            seen_ids.add(step.id)
-        return True
+            for input_id in step.inputs or []:
+                if input_id not in steps_by_id:
+                    logger.error("Step %s depends on non-existent Step %s", step.id, input_id)
+                    return False, [], {}
+                if step.type != "synthesize" and steps_by_id[input_id].type == "synthesize":
+                    # Synthesize steps run after every other step, so this edge can never be satisfied
+                    logger.error("Step %s (%s) depends on synthesize Step %s, which runs last",
+                                 step.id, step.type, input_id)
+                    return False, [], {}
+
+        deps = self._dependencies(plan)
+        indegree = {step_id: len(step_deps) for step_id, step_deps in deps.items()}
+        dependents: Dict[int, List[int]] = {step_id: [] for step_id in steps_by_id}
+        for step_id, step_deps in deps.items():
+            for dep_id in step_deps:
+                dependents[dep_id].append(step_id)
+
+        queue = deque(step.id for step in plan.steps if indegree[step.id] == 0)
+        order: List[ResearchStep] = []
+        while queue:
+            step_id = queue.popleft()
+            order.append(steps_by_id[step_id])
+            for dependent_id in dependents[step_id]:
+                indegree[dependent_id] -= 1
+                if indegree[dependent_id] == 0:
+                    queue.append(dependent_id)
+
+        if len(order) != len(plan.steps):
+            cyclic = sorted(step_id for step_id, n in indegree.items() if n > 0)
+            logger.error("Plan contains a dependency cycle among Steps %s", cyclic)
+            return False, [], {}
+        return True, order, deps
+
+    def _dependencies(self, plan: ResearchPlan) -> Dict[int, Set[int]]:
+        """
+        Step ID -> IDs it must wait for. Synthesize steps are a final barrier:
+        they wait for every non-synthesize step regardless of declared inputs.
+        """
+        barrier_ids = {step.id for step in plan.steps if step.type != "synthesize"}
+        return {
+            step.id: set(barrier_ids) if step.type == "synthesize" else set(step.inputs or [])
+            for step in plan.steps
+        }
 
     def execute_step(self, step: ResearchStep) -> bool:
-        logger.info(f"Executing Step {step.id}: {step.type} - {step.description}")
+        logger.info("Executing Step %s: %s - %s", step.id, step.type, step.description)
         
         try:
             if step.type == "research":
@@ -65,24 +139,8 @@ class Executor:
                 self.execution_log.add_entry(step.id, "success", output=result)
                 
             elif step.type == "compare":
-                items_to_compare = {}
-                if step.inputs:
-                    for input_id in step.inputs:
-                        prev_output = self.execution_log.artifacts.get(input_id)
-                        if isinstance(prev_output, ResearchOutput):
-                            items_to_compare[f"Step_{input_id}"] = prev_output
-                        else:
-                            logger.warning(f"Step {step.id} input {input_id} is not a ResearchOutput, skipping.")
-                
-                if not items_to_compare:
-                     raise ValueError("Comparison step requires at least one valid ResearchOutput input.")
-
-                inp = ComparisonInput(
-                    items=items_to_compare,
-                    dimensions=step.constraints if step.constraints else ["general"]
-                )
                 # Pass LLM client and Mode
-                result = execute_compare(inp, self.llm_client, mode=self.mode)
+                result = execute_compare(self._comparison_input(step), self.llm_client, mode=self.mode)
                 self.execution_log.add_entry(step.id, "success", output=result)
 
             elif step.type == "synthesize":
@@ -95,22 +153,183 @@ class Executor:
             return True
 
         except Exception as e:
-            logger.error(f"Step {step.id} failed: {e}")
+            logger.error("Step %s failed: %s", step.id, e)
             self.execution_log.add_entry(step.id, "error", error=str(e))
             return False
 
     def run(self, plan: ResearchPlan) -> ExecutionLog:
-        logger.info(f"Starting execution of plan: {plan.research_goal}")
+        logger.info("Starting execution of plan: %s", plan.research_goal)
         
-        if not self.validate_plan(plan):
+        ok, order, deps = self.validate_plan(plan)
+        if not ok:
             logger.error("Plan validation failed.")
             return self.execution_log
 
-        for step in plan.steps:
-            success = self.execute_step(step)
-            if not success:
+        # Runtime copy of the dependency DAG from validation
+        steps_by_id = {step.id: step for step in order}
+        indegree = {step_id: len(step_deps) for step_id, step_deps in deps.items()}
+        dependents: Dict[int, List[int]] = {step.id: [] for step in order}
+        for step_id, step_deps in deps.items():
+            for dep_id in step_deps:
+                dependents[dep_id].append(step_id)
+
+        # Dispatch ready steps concurrently (LLM calls are I/O bound), only
+        # serializing on true data dependencies.
+        ready = [step for step in order if indegree[step.id] == 0]
+        running = {}
+        failed = False
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while (ready and not failed) or running:
+                while ready and not failed:
+                    step = ready.pop(0)
+                    running[pool.submit(self.execute_step, step)] = step
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    if not future.result():
+                        failed = True
+                        continue
+                    for dependent_id in dependents[step.id]:
+                        indegree[dependent_id] -= 1
+                        if indegree[dependent_id] == 0:
+                            ready.append(steps_by_id[dependent_id])
+
+        if failed:
+            logger.error("Stopping execution due to step failure.")
+
+        logger.info("Execution complete.")
+        return self.execution_log
+
+    def _comparison_input(self, step: ResearchStep) -> ComparisonInput:
+        items_to_compare = {}
+        if step.inputs:
+            for input_id in step.inputs:
+                prev_output = self.execution_log.artifacts.get(input_id)
+                if isinstance(prev_output, ResearchOutput):
+                    items_to_compare[f"Step_{input_id}"] = prev_output
+                else:
+                    logger.warning("Step %s input %s is not a ResearchOutput, skipping.", step.id, input_id)
+        
+        if not items_to_compare:
+             raise ValueError("Comparison step requires at least one valid ResearchOutput input.")
+
+        return ComparisonInput(
+            items=items_to_compare,
+            dimensions=step.constraints if step.constraints else ["general"]
+        )
+
+    def execute_steps_batched(self, steps: List[ResearchStep], max_workers: int = 8) -> List[bool]:
+        """
+        Executes mutually independent steps, sending the prompts of every normal-mode
+        compare step in one generate_many fan-out instead of one request per step.
+        Steps that make no LLM call run through execute_step. Returns success per step, in order.
+        """
+        results: Dict[int, bool] = {}
+        batch: List[Tuple[ResearchStep, ComparisonInput]] = []
+        for step in steps:
+            if step.type != "compare" or self.mode == ExecutionMode.STRESS_TEST:
+                results[step.id] = self.execute_step(step)
+                continue
+            try:
+                batch.append((step, self._comparison_input(step)))
+            except Exception as e:
+                logger.error("Step %s failed: %s", step.id, e)
+                self.execution_log.add_entry(step.id, "error", error=str(e))
+                results[step.id] = False
+
+        if batch:
+            logger.info("Batching %s compare steps into one LLM fan-out", len(batch))
+            prompts = [(COMPARE_SYSTEM_PROMPT, build_compare_prompt(inp)) for _, inp in batch]
+            responses = self.llm_client.generate_many(prompts, max_workers=max_workers)
+            for (step, inp), response in zip(batch, responses):
+                self.execution_log.add_entry(step.id, "success", output=parse_compare_response(inp, response))
+                results[step.id] = True
+
+        return [results[step.id] for step in steps]
+
+    def stream_step(self, step: ResearchStep) -> Iterator[str]:
+        """
+        Like execute_step, but yields text as it is produced: the raw LLM output of a
+        normal-mode compare step, or a one-line summary for steps that make no LLM call.
+        The outcome is recorded in the execution log exactly as execute_step records it.
+        """
+        if step.type != "compare" or self.mode == ExecutionMode.STRESS_TEST:
+            if self.execute_step(step):
+                output = self.execution_log.artifacts.get(step.id)
+                yield getattr(output, "summary", None) or f"Step {step.id} complete."
+            return
+
+        logger.info("Streaming Step %s: %s - %s", step.id, step.type, step.description)
+        try:
+            inp = self._comparison_input(step)
+            chunks = []
+            for chunk in self.llm_client.stream(COMPARE_SYSTEM_PROMPT, build_compare_prompt(inp)):
+                chunks.append(chunk)
+                yield chunk
+            self.execution_log.add_entry(step.id, "success", output=parse_compare_response(inp, "".join(chunks)))
+        except Exception as e:
+            logger.error("Step %s failed: %s", step.id, e)
+            self.execution_log.add_entry(step.id, "error", error=str(e))
+
+    async def execute_step_async(self, step: ResearchStep) -> bool:
+        """Runs execute_step on the loop's default thread pool so it can be awaited alongside other steps."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.execute_step, step)
+
+    async def arun(self, plan: ResearchPlan, max_parallel: Optional[int] = None,
+                   on_step_done: Optional[Callable[[ResearchStep, bool], None]] = None,
+                   batched: bool = False,
+                   schedule: Optional[Tuple[bool, List[ResearchStep], Dict[int, Set[int]]]] = None) -> ExecutionLog:
+        """
+        Async counterpart of run: executes the plan in topological waves with asyncio.gather.
+        max_parallel caps concurrently running steps (default: max_workers). on_step_done is
+        called on the event loop thread as each step finishes, e.g. to update a UI.
+        batched=True runs each wave through execute_steps_batched (one LLM fan-out per wave);
+        on_step_done then fires when the wave completes.
+        schedule: a validate_plan result computed earlier for this plan, to skip re-validating it.
+        """
+        logger.info("Starting async execution of plan: %s", plan.research_goal)
+        
+        ok, order, deps = schedule or self.validate_plan(plan)
+        if not ok:
+            logger.error("Plan validation failed.")
+            return self.execution_log
+
+        semaphore = asyncio.Semaphore(max_parallel or self.max_workers)
+
+        async def run_step(step: ResearchStep) -> bool:
+            async with semaphore:
+                success = await self.execute_step_async(step)
+            if on_step_done is not None:
+                on_step_done(step, success)
+            return success
+
+        pending = list(order)
+        completed: Set[int] = set()
+        while pending:
+            # A wave is every pending step whose dependencies have all completed
+            ready = [step for step in pending if deps[step.id] <= completed]
+            if not ready:
+                logger.error("No runnable steps left; remaining dependencies cannot be satisfied.")
+                break
+
+            if batched:
+                results = await asyncio.to_thread(self.execute_steps_batched, ready, max_parallel or self.max_workers)
+                if on_step_done is not None:
+                    for step, success in zip(ready, results):
+                        on_step_done(step, success)
+            else:
+                results = await asyncio.gather(*[run_step(step) for step in ready])
+            for step, success in zip(ready, results):
+                if success:
+                    completed.add(step.id)
+            ready_ids = {step.id for step in ready}
+            pending = [step for step in pending if step.id not in ready_ids]
+
+            if not all(results):
                 logger.error("Stopping execution due to step failure.")
                 break
-        
+
         logger.info("Execution complete.")
         return self.execution_log
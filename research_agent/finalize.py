@@ -0,0 +1,57 @@
+from typing import Tuple
+from pydantic import TypeAdapter
+from .schema import ResearchPlan, SynthesisOutput, VerificationOutput, CombinedOutcome
+from .utils import LLMClient, setup_logger
+from .executor import ExecutionLog
+from .json_utils import parse_llm_json
+from .synthesizer import Synthesizer, ARTIFACT_LEGEND, SYNTHESIS_EXAMPLE, budget_context, clean_synthesis_data
+from .verifier import Verifier, check_coverage, decide_outcome
+
+logger = setup_logger("finalizer")
+
+_COMBINED_ADAPTER = TypeAdapter(CombinedOutcome)
+
+FINALIZER_SYSTEM_PROMPT = f"""You are a Research Synthesizer and strict Research Auditor. Output JSON only. Step IDs must be INTEGERS.
+{ARTIFACT_LEGEND}
+
+Return {{"synthesis": {{...}}, "verification": {{...}}}}.
+"synthesis" is a directional summary of the artifacts that is honest about uncertainty.
+"verification" audits that synthesis: are there unsupported claims, is the confidence level appropriate?
+If the synthesis admits to knowing nothing or major key data is missing, recommend ABSTENTION.
+
+EXAMPLE OUTPUT:
+{{"synthesis": {SYNTHESIS_EXAMPLE}, "verification": {{"overclaim_detected": false, "missing_assumptions": ["str"], "required_disclaimers": ["str"], "confidence_adjustment": "none", "recommend_abstain": false, "abstain_reason": null}}}}
+"""
+
+class Finalizer:
+    """
+    Synthesizes and verifies in a single LLM call.
+    Equivalent to Synthesizer.synthesize followed by Verifier.verify, which remain
+    available for isolated use and as the fallback when the combined output is malformed.
+    """
+    def __init__(self, llm_client: LLMClient):
+        self.llm = llm_client
+
+    def finalize(self, execution_log: ExecutionLog, plan: ResearchPlan, original_goal: str) -> Tuple[SynthesisOutput, VerificationOutput]:
+        logger.info("Synthesizing and verifying results...")
+
+        # Coverage Check (Rule-based)
+        coverage, executed_ids = check_coverage(plan, execution_log)
+
+        prompt = f"""QUERY: {original_goal}
+RESEARCH GOAL: {plan.research_goal}
+ARTIFACTS: {budget_context(execution_log)}"""
+
+        response = self.llm.generate(system_prompt=FINALIZER_SYSTEM_PROMPT, user_prompt=prompt)
+
+        try:
+            data = parse_llm_json(response)
+            if isinstance(data.get("synthesis"), dict):
+                clean_synthesis_data(data["synthesis"])
+            combined = _COMBINED_ADAPTER.validate_python(data)
+        except Exception as e:
+            logger.warning("Combined output unusable (%s); falling back to separate synthesis and verification.", e)
+            synthesis = Synthesizer(self.llm).synthesize(execution_log, original_goal)
+            return synthesis, Verifier(self.llm).verify(plan, execution_log, synthesis)
+
+        return combined.synthesis, decide_outcome(plan, coverage, executed_ids, combined.verification)
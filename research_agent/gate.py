@@ -0,0 +1,61 @@
+import re
+import operator
+from typing import Optional
+from .schema import GateDecision, FinalOutcome
+from .utils import setup_logger
+
+logger = setup_logger("gate")
+
+# Queries at or below this many whitespace tokens are too vague to plan research for
+MAX_TRIVIAL_TOKENS = 3
+
+# e.g. "what is 2+2", "12 * 3?", "compute 7 / 2"
+_ARITHMETIC = re.compile(
+    r"^\s*(?:what\s+is|what's|calculate|compute)?\s*"
+    r"(-?\d+(?:\.\d+)?)\s*([-+*/x])\s*(-?\d+(?:\.\d+)?)\s*\??\s*$",
+    re.I
+)
+_OPERATORS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "x": operator.mul,
+    "X": operator.mul,
+    "/": operator.truediv,
+}
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else f"{value:g}"
+
+def should_bypass(query: str) -> Optional[GateDecision]:
+    """
+    Cheap deterministic pre-filter run before planning.
+    Returns a decision when the query can be served (or refused) without the
+    planner -> executor -> synthesizer -> verifier pipeline, otherwise None.
+    """
+    text = (query or "").strip()
+    if not text:
+        return GateDecision(final_outcome=FinalOutcome.ABSTAINED, reason="Empty query.")
+
+    match = _ARITHMETIC.match(text)
+    if match:
+        left, op, right = float(match.group(1)), match.group(2), float(match.group(3))
+        try:
+            result = _OPERATORS[op](left, right)
+        except ZeroDivisionError:
+            return GateDecision(final_outcome=FinalOutcome.ABSTAINED, reason="Division by zero is undefined.")
+        logger.info("Gate answered arithmetic query directly: %s", text)
+        return GateDecision(
+            final_outcome=FinalOutcome.ANSWERED,
+            reason="Deterministic arithmetic query.",
+            answer=_format_number(result)
+        )
+
+    if len(text.split()) <= MAX_TRIVIAL_TOKENS:
+        logger.info("Gate abstained on underspecified query: %s", text)
+        return GateDecision(
+            final_outcome=FinalOutcome.ABSTAINED,
+            reason="Query is too short to define a research goal."
+        )
+
+    return None
@@ -0,0 +1,86 @@
+import json
+import re
+from typing import Any, Iterable
+
+try:
+    import orjson
+except ImportError: # Optional speedup, stdlib json is used otherwise
+    orjson = None
+
+# Matches a response that is wholly one markdown code fence, e.g. ```json\n{...}\n``` or ```JSON ...```.
+# Anchored, so a fence inside a JSON string value is left alone.
+_FENCE = re.compile(r"\s*```(?:json)?\s*(.*?)\s*```\s*", re.S | re.I)
+
+def extract_json_payload(text: str) -> str:
+    """Returns the JSON text of an LLM response, without a markdown fence wrapping the whole response."""
+    match = _FENCE.fullmatch(text)
+    return match.group(1) if match else text.strip()
+
+def parse_llm_json(text: str) -> Any:
+    """
+    Parses JSON emitted by an LLM, stripping a surrounding markdown fence if present.
+    Raises json.JSONDecodeError (or its orjson subclass) on invalid JSON.
+    """
+    return _loads(extract_json_payload(text))
+
+def _loads(payload: str) -> Any:
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+def parse_json_stream(chunks: Iterable[str], roots: str = "{[") -> Any:
+    """
+    Parses the first complete top-level JSON object/array from streamed text chunks,
+    returning as soon as its closing bracket arrives rather than when the stream ends.
+    Text around it (markdown fences, prose) is ignored; a bracketed span that fails to
+    parse is skipped. roots="{" only accepts an object, so prose like "see [1]" before
+    it is skipped too. Raises ValueError if the stream ends without a complete value.
+    """
+    text = ""
+    start = None
+    depth = 0
+    in_string = escape = False
+    for chunk in chunks:
+        offset = len(text)
+        text += chunk
+        for i in range(offset, len(text)):
+            ch = text[i]
+            if start is None:
+                if ch in roots:
+                    start, depth = i, 1
+            elif in_string:
+                if escape:
+                    escape = False
+                elif ch == "\\":
+                    escape = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch in "{[":
+                depth += 1
+            elif ch in "}]":
+                depth -= 1
+                if depth == 0:
+                    try:
+                        return _loads(text[start:i + 1])
+                    except ValueError:
+                        start = None
+    raise ValueError("Stream ended before a complete JSON value")
+
+def dumps_json_bytes(obj: Any) -> bytes:
+    """Serializes to compact UTF-8 JSON (no whitespace between separators)."""
+    if orjson is not None:
+        # Non-str keys (e.g. step IDs) are stringified, matching stdlib json
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+def dumps_json(obj: Any) -> str:
+    """Serializes to compact JSON text (no whitespace between separators)."""
+    return dumps_json_bytes(obj).decode()
+
+def dumps_json_indented(obj: Any) -> str:
+    """Serializes to human-readable JSON text indented by two spaces, for display."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, indent=2)
@@ -1,7 +1,10 @@
-import json
-from typing import Optional
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+from pydantic import TypeAdapter, ValidationError
 from .schema import ResearchPlan, ResearchStep
 from .utils import setup_logger, LLMClient
+from .json_utils import extract_json_payload
 
 logger = setup_logger("planner")
 
@@ -71,36 +74,92 @@ JSON:
 }
 """
 
+# Short digest of the system prompt; part of the plan cache key so prompt edits invalidate it
+PLANNER_PROMPT_VERSION = hashlib.md5(PLANNER_SYSTEM_PROMPT.encode()).hexdigest()[:8]
+# Provider-side prompt cache key: every planner call shares the static system prompt prefix
+PLANNER_CACHE_KEY = f"planner-{PLANNER_PROMPT_VERSION}"
+
+# Built once; validate_json parses and validates LLM output in a single pass
+_PLAN_ADAPTER = TypeAdapter(ResearchPlan)
+
+def _build_prompt(user_query: str) -> str:
+    return f"User Query: {user_query}\n\nGenerate the JSON ResearchPlan:"
+
+# --- PLAN MEMO ---
+# Plans are a pure function of (provider, query, planner prompt), so they are memoized
+# per process. The client is not part of the key: clients for the same provider share
+# entries and are not kept alive by the memo. Bounded; oldest entries evicted first.
+_PLAN_MEMO: Dict[Tuple[str, str, str], str] = {}
+_PLAN_MEMO_LOCK = threading.Lock()
+_PLAN_MEMO_MAX = 1024
+
+def _cached_plan(llm: LLMClient, user_query: str) -> str:
+    """Returns the validated plan JSON for a query; failures raise and are never cached."""
+    key = (llm.provider, user_query, PLANNER_PROMPT_VERSION)
+    with _PLAN_MEMO_LOCK:
+        cached = _PLAN_MEMO.get(key)
+    if cached is not None:
+        logger.info("Plan memo hit for query: %s", user_query)
+        return cached
+
+    # In a real implementation with a chat model, we'd pass system prompt strictly.
+    # Here we combine for simplicity depending on the client.
+    data = llm.generate_json(system_prompt=PLANNER_SYSTEM_PROMPT, user_prompt=_build_prompt(user_query),
+                             cache_key=PLANNER_CACHE_KEY)
+    try:
+        plan_json = _PLAN_ADAPTER.validate_python(data).model_dump_json()
+    except ValidationError:
+        logger.debug("Raw output: %s", data)
+        raise
+
+    with _PLAN_MEMO_LOCK:
+        if len(_PLAN_MEMO) >= _PLAN_MEMO_MAX:
+            _PLAN_MEMO.pop(next(iter(_PLAN_MEMO)))
+        _PLAN_MEMO[key] = plan_json
+    return plan_json
+
 class Planner:
     def __init__(self, llm_client: LLMClient):
         self.llm = llm_client
 
+    def _parse_plan(self, full_response: str) -> Optional[ResearchPlan]:
+        try:
+            plan = _PLAN_ADAPTER.validate_json(extract_json_payload(full_response))
+            logger.info("Plan generated successfully.")
+            return plan
+            
+        except ValidationError as e:
+            logger.error("Failed to parse Planner JSON: %s", e)
+            logger.debug("Raw output: %s", full_response)
+            return None
+        except Exception as e:
+            logger.error("Planner failed: %s", e)
+            return None
+
     def plan(self, user_query: str) -> Optional[ResearchPlan]:
-        logger.info(f"Planning for query: {user_query}")
-        
-        prompt = f"User Query: {user_query}\n\nGenerate the JSON ResearchPlan:"
+        logger.info("Planning for query: %s", user_query)
         
         try:
-            # In a real implementation with a chat model, we'd pass system prompt strictly.
-            # Here we combine for simplicity depending on the client.
-            full_response = self.llm.generate(system_prompt=PLANNER_SYSTEM_PROMPT, user_prompt=prompt)
-            
-            # Clean response (remove markdown fences if any)
-            clean_json = full_response.strip()
-            if clean_json.startswith("```json"):
-                clean_json = clean_json[7:]
-            if clean_json.endswith("```"):
-                clean_json = clean_json[:-3]
-            
-            data = json.loads(clean_json)
-            plan = ResearchPlan(**data)
+            plan = _PLAN_ADAPTER.validate_json(_cached_plan(self.llm, user_query))
             logger.info("Plan generated successfully.")
             return plan
             
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse Planner JSON: {e}")
-            logger.debug(f"Raw output: {full_response}")
+        except ValidationError as e:
+            logger.error("Failed to parse Planner JSON: %s", e)
             return None
         except Exception as e:
-            logger.error(f"Planner failed: {e}")
+            logger.error("Planner failed: %s", e)
             return None
+
+    def plan_many(self, user_queries: List[str]) -> List[Optional[ResearchPlan]]:
+        """Plans several independent queries with a single fan-out of LLM requests."""
+        logger.info("Planning %s queries in one batch", len(user_queries))
+        
+        prompts = [(PLANNER_SYSTEM_PROMPT, _build_prompt(q)) for q in user_queries]
+        try:
+            responses = self.llm.generate_many(prompts, cache_key=PLANNER_CACHE_KEY)
+        except Exception as e:
+            logger.error("Batch planning failed: %s", e)
+            return [None] * len(user_queries)
+
+        return [self._parse_plan(r) for r in responses]
@@ -1,7 +1,14 @@
 from pydantic import BaseModel, Field
-from typing import Literal, List, Dict, Optional, Union
+from typing import Literal, List, Dict, Optional, Union, Any
 from enum import Enum
 
+# Limits for the compact projections embedded in downstream LLM prompts
+COMPACT_MAX_POINTS = 5
+COMPACT_MAX_CHARS = 400
+
+def _clip(text: str, limit: int = COMPACT_MAX_CHARS) -> str:
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
 # --- V2 Enums ---
 class ExecutionMode(str, Enum):
     NORMAL = "normal"
@@ -42,6 +49,14 @@ class ResearchOutput(BaseModel):
     gaps: List[str]
     sources: Optional[List[str]] = Field(default=None, description="List of sources used")
 
+    def to_compact(self) -> Dict[str, Any]:
+        """Token-lean projection for prompts: s=summary, k=key points, c=confidence."""
+        return {
+            "s": _clip(self.summary),
+            "k": [_clip(p) for p in self.key_points[:COMPACT_MAX_POINTS]],
+            "c": self.confidence
+        }
+
 class ComparisonInput(BaseModel):
     items: Dict[str, ResearchOutput] = Field(..., description="Dict of Item Name -> ResearchOutput to compare")
     dimensions: List[str] = Field(..., description="Specific dimensions to compare")
@@ -52,6 +67,14 @@ class ComparisonOutput(BaseModel):
     tradeoffs: List[str]
     uncertainties: List[str]
 
+    def to_compact(self) -> Dict[str, Any]:
+        """Token-lean projection for prompts: x=contrasts, t=tradeoffs, u=uncertainties."""
+        return {
+            "x": {d: {k: _clip(v) for k, v in items.items()} for d, items in self.contrasts.items()},
+            "t": [_clip(t) for t in self.tradeoffs[:COMPACT_MAX_POINTS]],
+            "u": [_clip(u) for u in self.uncertainties[:COMPACT_MAX_POINTS]]
+        }
+
 # --- Synthesis Schemas ---
 
 class SynthesisOutput(BaseModel):
@@ -72,3 +95,23 @@ class VerificationOutput(BaseModel):
     missing_assumptions: List[str]
     required_disclaimers: List[str]
     confidence_adjustment: Literal["none", "downgrade"]
+
+class AuditResponse(BaseModel):
+    """The LLM half of verification; missing fields fall back to a clean audit."""
+    overclaim_detected: bool = False
+    missing_assumptions: List[str] = Field(default_factory=list)
+    required_disclaimers: List[str] = Field(default_factory=list)
+    confidence_adjustment: Literal["none", "downgrade"] = "none"
+    recommend_abstain: bool = False
+    abstain_reason: Optional[str] = None
+
+class CombinedOutcome(BaseModel):
+    synthesis: SynthesisOutput
+    verification: AuditResponse = Field(..., description="Audit of the synthesis, same fields as the Verifier's LLM check")
+
+# --- Gate Schemas ---
+
+class GateDecision(BaseModel):
+    final_outcome: FinalOutcome
+    reason: str = Field(..., description="Why the query bypassed the research pipeline")
+    answer: Optional[str] = Field(default=None, description="Direct answer when the query could be served without research")
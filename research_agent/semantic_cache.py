@@ -0,0 +1,113 @@
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from .utils import setup_logger
+
+logger = setup_logger("semantic_cache")
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+_INITIAL_CAPACITY = 64 # Rows preallocated; the buffers double when full
+
+@lru_cache(maxsize=None)
+def load_encoder(model_name: str = EMBEDDING_MODEL):
+    """Loads a sentence-transformers encoder once per process. Returns None if it is not installed."""
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError as e:
+        logger.warning("Semantic cache disabled, missing dependency: %s", e)
+        return None
+    return SentenceTransformer(model_name)
+
+class SemanticCache:
+    """
+    In-memory nearest-neighbour cache over prompt embeddings.
+
+    query() returns the value stored for the most similar earlier prompt when
+    cosine similarity >= threshold. Entries may carry a scope; a scoped query only
+    matches entries with the same scope. With a ttl, entries older than ttl seconds
+    never match. Adding under an existing key replaces that entry. Without
+    sentence-transformers every query misses and add() is a no-op.
+    """
+
+    def __init__(self, threshold: float = 0.95, model_name: str = EMBEDDING_MODEL, ttl: Optional[float] = None):
+        self.threshold = threshold
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._values: List[Any] = []
+        self._scope_ids: Dict[Any, int] = {} # Scope -> small int, so scope filtering is one vector compare
+        self._rows: Dict[Any, int] = {} # Key -> row, for entries added with a key
+        self._encoder = load_encoder(model_name)
+        if self._encoder is None:
+            return
+
+        import numpy as np # Installed with sentence-transformers
+        self._np = np
+        # Rows [0, len(self._values)) are live; adding amortizes to O(1) instead of copying the matrix
+        self._matrix = np.zeros((_INITIAL_CAPACITY, self._encoder.get_sentence_embedding_dimension()), dtype=np.float32)
+        self._scope_col = np.full(_INITIAL_CAPACITY, -1, dtype=np.int32)
+        self._ts_col = np.zeros(_INITIAL_CAPACITY, dtype=np.float64)
+
+    @property
+    def enabled(self) -> bool:
+        return self._encoder is not None
+
+    def embed(self, text: str):
+        # Normalized so that the inner product equals cosine similarity
+        return self._encoder.encode([text], normalize_embeddings=True)[0].astype(self._np.float32)
+
+    def query(self, text: str, scope: Any = None) -> Optional[Any]:
+        if not self.enabled:
+            return None
+
+        vector = self.embed(text)
+        with self._lock:
+            n = len(self._values)
+            if n == 0 or (scope is not None and scope not in self._scope_ids):
+                return None
+            sims = self._matrix[:n] @ vector
+            live = self._ts_col[:n] >= time.time() - self.ttl if self.ttl is not None else None
+            if scope is not None:
+                in_scope = self._scope_col[:n] == self._scope_ids[scope]
+                live = in_scope if live is None else live & in_scope
+            if live is not None:
+                sims = self._np.where(live, sims, -self._np.inf)
+            best_idx = int(sims.argmax())
+            best_sim = float(sims[best_idx])
+
+            if best_sim >= self.threshold:
+                logger.info("Semantic cache hit (similarity=%.3f)", best_sim)
+                return self._values[best_idx]
+        return None
+
+    def add(self, text: str, value: Any, scope: Any = None, vector=None, key: Any = None,
+            ts: Optional[float] = None):
+        """
+        Stores value under text's embedding; pass vector to reuse an embedding computed
+        earlier. ts is the entry's creation time (default: now), checked against ttl.
+        """
+        if not self.enabled:
+            return
+
+        if vector is None:
+            vector = self.embed(text)
+        with self._lock:
+            row = self._rows.get(key) if key is not None else None
+            if row is None:
+                row = len(self._values)
+                if row == len(self._matrix):
+                    self._grow()
+                self._values.append(value)
+                if key is not None:
+                    self._rows[key] = row
+            else:
+                self._values[row] = value
+            self._matrix[row] = vector
+            self._scope_col[row] = -1 if scope is None else self._scope_ids.setdefault(scope, len(self._scope_ids))
+            self._ts_col[row] = time.time() if ts is None else ts
+
+    def _grow(self):
+        np = self._np
+        self._matrix = np.concatenate([self._matrix, np.zeros_like(self._matrix)])
+        self._scope_col = np.concatenate([self._scope_col, np.full_like(self._scope_col, -1)])
+        self._ts_col = np.concatenate([self._ts_col, np.zeros_like(self._ts_col)])
@@ -1,10 +1,109 @@
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List
+from pydantic import TypeAdapter
 from .schema import SynthesisOutput
 from .utils import LLMClient, setup_logger
 from .executor import ExecutionLog
-import json
+from .json_utils import parse_llm_json, dumps_json_bytes
 
 logger = setup_logger("synthesizer")
 
+_SYNTHESIS_ADAPTER = TypeAdapter(SynthesisOutput)
+
+# Shared with the Finalizer's combined prompt
+ARTIFACT_LEGEND = """Artifacts are a JSON object keyed by step ID.
+Research fields: s=summary, k=key points, c=confidence. Comparison fields: x=contrasts, t=tradeoffs, u=uncertainties."""
+
+SYNTHESIS_EXAMPLE = """{"directional_summary": "Evidence leans towards A, but data is thin.", "hypotheses": ["Hypothesis A"], "supported_by": {"Hypothesis A": [1, 3]}, "open_questions": ["How does B behave at scale?"], "confidence": "low"}"""
+
+SYNTHESIZER_SYSTEM_PROMPT = f"""You are a Research Synthesizer. Output JSON only. Step IDs must be INTEGERS.
+{ARTIFACT_LEGEND}
+
+EXAMPLE OUTPUT:
+{SYNTHESIS_EXAMPLE}
+"""
+
+# Upper bound on the artifacts context embedded in synthesis prompts
+MAX_CONTEXT_TOKENS = 4000
+_CONFIDENCE_RANK = {"high": 2, "medium": 1, "low": 0}
+
+_DIGITS_RE = re.compile(r"\d+")
+
+@lru_cache(maxsize=None)
+def _token_counter(model: str = "gpt-4o") -> Callable[[str], int]:
+    try:
+        import tiktoken
+        encoding = tiktoken.encoding_for_model(model)
+        return lambda text: len(encoding.encode(text))
+    except Exception as e: # tiktoken missing or encoding unavailable offline
+        logger.debug("tiktoken unavailable (%s); estimating ~4 chars per token", e)
+        return lambda text: len(text) // 4 + 1
+
+def budget_context(execution_log: ExecutionLog, max_tokens: int = MAX_CONTEXT_TOKENS) -> str:
+    """
+    Joins the compact JSON cached at insertion (markers have none) into one object,
+    keeping the total under `max_tokens`. Artifacts are admitted greedily by
+    confidence, then recency; any that don't fit are replaced by a placeholder
+    carrying just their topic and confidence. Output is sorted by step ID so
+    concurrent completion order doesn't change the prompt.
+    """
+    count_tokens = _token_counter()
+    items = sorted(execution_log.serialized_artifacts().items())
+
+    def priority(item):
+        confidence = getattr(execution_log.artifacts.get(item[0]), "confidence", "medium")
+        return (_CONFIDENCE_RANK.get(confidence, 1), item[0])
+
+    kept = set()
+    used = 0
+    for step_id, blob in sorted(items, key=priority, reverse=True):
+        cost = count_tokens(blob.decode())
+        if used + cost <= max_tokens:
+            kept.add(step_id)
+            used += cost
+
+    parts = []
+    for step_id, blob in items:
+        if step_id not in kept:
+            artifact = execution_log.artifacts.get(step_id)
+            blob = dumps_json_bytes({
+                "note": f"[Step {step_id}: summary elided]",
+                "topic": getattr(artifact, "topic", None),
+                "c": getattr(artifact, "confidence", None)
+            })
+        parts.append(b'"%d":%s' % (step_id, blob))
+    if len(kept) < len(items):
+        logger.info("Context budget: elided %s of %s artifacts", len(items) - len(kept), len(items))
+    return (b"{" + b",".join(parts) + b"}").decode()
+
+def _step_ids(ids: List[Any]) -> List[int]:
+    cleaned_ids = []
+    for i in ids:
+        if isinstance(i, int):
+            cleaned_ids.append(i)
+        elif isinstance(i, str):
+            # Extract number from "Step_1" or "Step 1"
+            match = _DIGITS_RE.search(i)
+            if match:
+                cleaned_ids.append(int(match.group()))
+    return cleaned_ids
+
+def clean_synthesis_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Data Cleaning: Ensure supported_by list contains integers."""
+    if "supported_by" in data:
+        data["supported_by"] = {hypo: _step_ids(ids) for hypo, ids in data["supported_by"].items()}
+    return data
+
+def failed_synthesis() -> SynthesisOutput:
+    return SynthesisOutput(
+        directional_summary="Failed to synthesize results.",
+        hypotheses=[],
+        supported_by={},
+        open_questions=["System Error during synthesis"],
+        confidence="low"
+    )
+
 class Synthesizer:
     def __init__(self, llm_client: LLMClient):
         self.llm = llm_client
@@ -12,68 +111,17 @@ class Synthesizer:
     def synthesize(self, execution_log: ExecutionLog, original_goal: str) -> SynthesisOutput:
         logger.info("Synthesizing results...")
         
-        # Prepare context
-        artifacts_text = ""
-        for step_id, artifact in execution_log.artifacts.items():
-            artifacts_text += f"\n--- Step {step_id} Output ---\n{str(artifact)}\n"
+        artifacts_text = budget_context(execution_log)
             
-        prompt = f"""
-        GOAL: {original_goal}
+        prompt = f"""GOAL: {original_goal}
+ARTIFACTS: {artifacts_text}
+Synthesize these findings into a directional summary. Be honest about uncertainty."""
         
-        ARTIFACTS:
-        {artifacts_text}
-        
-        Synthesize these findings into a directional summary.
-        Be honest about uncertainty.
-        
-        OUTPUT JSON SCHEMA:
-        {{
-            "directional_summary": "str",
-            "hypotheses": ["str"],
-            "supported_by": {{"hypothesis_text": [int]}}, 
-            "open_questions": ["str"],
-            "confidence": "low" | "medium"
-        }}
-        EXAMPLE:
-        "supported_by": {{"Hypothesis A": [1, 3]}}
-        """
-        
-        response = self.llm.generate(system_prompt="You are a Research Synthesizer. Output JSON only. Step IDs must be INTEGERS.", user_prompt=prompt)
+        response = self.llm.generate(system_prompt=SYNTHESIZER_SYSTEM_PROMPT, user_prompt=prompt)
         
         try:
-            clean_json = response.strip()
-            if clean_json.startswith("```json"): clean_json = clean_json[7:]
-            if clean_json.endswith("```"): clean_json = clean_json[:-3]
-            
-            data = json.loads(clean_json)
-            
-            # Data Cleaning: Ensure supported_by list contains integers
-            if "supported_by" in data:
-                cleaned_supported_by = {}
-                for hypo, ids in data["supported_by"].items():
-                    cleaned_ids = []
-                    for i in ids:
-                        if isinstance(i, int):
-                            cleaned_ids.append(i)
-                        elif isinstance(i, str):
-                            # Try to extract number from "Step_1" or "Step 1"
-                            try:
-                                # Remove non-digit chars
-                                digit_str = ''.join(filter(str.isdigit, i))
-                                if digit_str:
-                                    cleaned_ids.append(int(digit_str))
-                            except:
-                                pass
-                    cleaned_supported_by[hypo] = cleaned_ids
-                data["supported_by"] = cleaned_supported_by
-
-            return SynthesisOutput(**data)
+            data = clean_synthesis_data(parse_llm_json(response))
+            return _SYNTHESIS_ADAPTER.validate_python(data)
         except Exception as e:
-            logger.error(f"Synthesis failed: {e}")
-            return SynthesisOutput(
-                directional_summary="Failed to synthesize results.",
-                hypotheses=[],
-                supported_by={},
-                open_questions=["System Error during synthesis"],
-                confidence="low"
-            )
+            logger.error("Synthesis failed: %s", e)
+            return failed_synthesis()
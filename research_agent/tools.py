@@ -1,58 +1,95 @@
+from pydantic import TypeAdapter
 from .schema import ResearchInput, ResearchOutput, ComparisonInput, ComparisonOutput, ExecutionMode
 from .utils import LLMClient, setup_logger
-from typing import List
+from .json_utils import extract_json_payload, dumps_json
+from typing import Dict, List, Tuple
 import json
-import random
+import threading
+import zlib
 
 logger = setup_logger("tools")
 
+_COMPARISON_ADAPTER = TypeAdapter(ComparisonOutput)
+
+# --- STRESS MODE TEMPLATES ---
+# Built once at import; "{topic}" is filled in per call.
+_STRESS_PARTIAL = ResearchOutput(
+    topic="{topic}",
+    summary="Partial data found for {topic}.",
+    key_points=["Some evidence suggests relevance, but details are missing."],
+    assumptions=["Extrapolating from limited data"],
+    confidence="low",
+    gaps=["Critical metrics missing"],
+    sources=["FragmentedDB"]
+)
+_STRESS_CONTRADICTORY = ResearchOutput(
+    topic="{topic}",
+    summary="Conflicting reports found regarding {topic}.",
+    key_points=[
+        "Source A claims {topic} is highly effective.",
+        "Source B claims {topic} has no measurable impact."
+    ],
+    assumptions=["Conflicting methodologies in sources"],
+    confidence="low",
+    gaps=["Unable to reconcile Source A and Source B"],
+    sources=["SourceA", "SourceB"]
+)
+_STRESS_EMPTY = ResearchOutput(
+    topic="{topic}",
+    summary="Insufficient data available to summarize.",
+    key_points=[],
+    assumptions=["Data source unreachable in stress test"],
+    confidence="low",
+    gaps=["All information missing due to stress injection"],
+    sources=[]
+)
+_STRESS_TEMPLATES = (_STRESS_PARTIAL, _STRESS_CONTRADICTORY, _STRESS_EMPTY)
+
+# --- TOPIC MEMO ---
+# Research is a pure function of (topic, mode, constraints), so repeated topics
+# within and across plans are served from memory. Keyed on the exact topic text, since
+# it is echoed into the output. Hits are deep copies, so callers never share the memo's
+# lists. Bounded; oldest entries evicted first.
+_RESEARCH_MEMO: Dict[Tuple[str, str, Tuple[str, ...]], ResearchOutput] = {}
+_RESEARCH_MEMO_LOCK = threading.Lock()
+_RESEARCH_MEMO_MAX = 1024
+
+def _normalize_topic(topic: str) -> str:
+    return topic.lower().strip()
+
 def execute_research(input_data: ResearchInput, llm_client: LLMClient = None, mode: ExecutionMode = ExecutionMode.NORMAL) -> ResearchOutput:
     """
     Research tool. Supports STRESS_TEST mode to inject noise.
     """
+    key = (input_data.topic, mode.value, tuple(input_data.constraints or ()))
+    with _RESEARCH_MEMO_LOCK:
+        cached = _RESEARCH_MEMO.get(key)
+    if cached is not None:
+        logger.info("Research memo hit for topic: %s | Mode: %s", input_data.topic, mode.value)
+        return cached.model_copy(deep=True)
+
+    result = _research(input_data, mode)
+    with _RESEARCH_MEMO_LOCK:
+        if len(_RESEARCH_MEMO) >= _RESEARCH_MEMO_MAX:
+            _RESEARCH_MEMO.pop(next(iter(_RESEARCH_MEMO)))
+        _RESEARCH_MEMO[key] = result
+    return result.model_copy(deep=True)
+
+def _research(input_data: ResearchInput, mode: ExecutionMode) -> ResearchOutput:
     topic = input_data.topic
-    logger.info(f"Researching topic: {topic} | Mode: {mode.value}")
+    logger.info("Researching topic: %s | Mode: %s", topic, mode.value)
     
     # --- STRESS MODE LOGIC ---
     if mode == ExecutionMode.STRESS_TEST:
-        logger.warning(f"Injector: Applying stress to research on '{topic}'")
-        
-        # Probabilistic failure types
-        failure_type = random.choice(["partial", "contradictory", "empty"])
+        logger.warning("Injector: Applying stress to research on '%s'", topic)
         
-        if failure_type == "empty":
-             return ResearchOutput(
-                topic=topic,
-                summary="Insufficient data available to summarize.",
-                key_points=[],
-                assumptions=["Data source unreachable in stress test"],
-                confidence="low",
-                gaps=["All information missing due to stress injection"],
-                sources=[]
-            )
-        elif failure_type == "contradictory":
-             return ResearchOutput(
-                topic=topic,
-                summary=f"Conflicting reports found regarding {topic}.",
-                key_points=[
-                    f"Source A claims {topic} is highly effective.",
-                    f"Source B claims {topic} has no measurable impact."
-                ],
-                assumptions=["Conflicting methodologies in sources"],
-                confidence="low",
-                gaps=["Unable to reconcile Source A and Source B"],
-                sources=["SourceA", "SourceB"]
-            )
-        # Default partial
-        return ResearchOutput(
-            topic=topic,
-            summary=f"Partial data found for {topic}.",
-            key_points=[f"Some evidence suggests relevance, but details are missing."],
-            assumptions=["Extrapolating from limited data"],
-            confidence="low",
-            gaps=["Critical metrics missing"],
-            sources=["FragmentedDB"]
-        )
+        # Failure type is a stable function of the topic, so stress runs are repeatable
+        template = _STRESS_TEMPLATES[zlib.crc32(_normalize_topic(topic).encode()) % len(_STRESS_TEMPLATES)]
+        return template.model_copy(update={
+            "topic": topic,
+            "summary": template.summary.format(topic=topic),
+            "key_points": [p.format(topic=topic) for p in template.key_points]
+        }, deep=True) # Deep, so outputs never share the template's lists
 
     # --- NORMAL MODE ---
     return ResearchOutput(
@@ -68,29 +105,37 @@ def execute_research(input_data: ResearchInput, llm_client: LLMClient = None, mo
         sources=["SimulationDB"]
     )
 
+COMPARE_SYSTEM_PROMPT = "You are a precise comparison engine. Output JSON only."
+
 def execute_compare(input_data: ComparisonInput, llm_client: LLMClient, mode: ExecutionMode = ExecutionMode.NORMAL) -> ComparisonOutput:
     """
     Comparison tool. Supports STRESS_TEST mode.
     """
-    logger.info(f"Executing comparison on dimensions: {input_data.dimensions} | Mode: {mode.value}")
+    logger.info("Executing comparison on dimensions: %s | Mode: %s", input_data.dimensions, mode.value)
     
     if mode == ExecutionMode.STRESS_TEST:
-        return ComparisonOutput(
-            dimensions=input_data.dimensions,
-            contrasts={d: {k: "Ambiguous data prevented clear contrast" for k in input_data.items} for d in input_data.dimensions},
-            tradeoffs=["Unable to determine clear tradeoffs due to data noise."],
-            uncertainties=["High uncertainty in input data reliability."]
-        )
+        return stress_comparison(input_data)
 
     # Normal Logic
-    items_text = ""
-    for name, output in input_data.items.items():
-        items_text += f"--- ITEM: {name} ---\nSummary: {output.summary}\nKey Points: {output.key_points}\n\n"
+    response = llm_client.generate(system_prompt=COMPARE_SYSTEM_PROMPT, user_prompt=build_compare_prompt(input_data))
+    return parse_compare_response(input_data, response)
+
+def stress_comparison(input_data: ComparisonInput) -> ComparisonOutput:
+    return ComparisonOutput(
+        dimensions=input_data.dimensions,
+        contrasts={d: {k: "Ambiguous data prevented clear contrast" for k in input_data.items} for d in input_data.dimensions},
+        tradeoffs=["Unable to determine clear tradeoffs due to data noise."],
+        uncertainties=["High uncertainty in input data reliability."]
+    )
+
+def build_compare_prompt(input_data: ComparisonInput) -> str:
+    """The user prompt for a normal-mode comparison; paired with COMPARE_SYSTEM_PROMPT."""
+    items_text = dumps_json({name: output.to_compact() for name, output in input_data.items.items()})
         
-    prompt = f"""
+    return f"""
     Compare the following items based on these dimensions: {input_data.dimensions}.
     
-    ITEMS:
+    ITEMS (s=summary, k=key points, c=confidence):
     {items_text}
     
     OUTPUT JSON FORMAT:
@@ -105,18 +150,13 @@ def execute_compare(input_data: ComparisonInput, llm_client: LLMClient, mode: Ex
         "uncertainties": ["string", ...]
     }}
     """
-    
-    response = llm_client.generate(system_prompt="You are a precise comparison engine. Output JSON only.", user_prompt=prompt)
-    
+
+def parse_compare_response(input_data: ComparisonInput, response: str) -> ComparisonOutput:
+    """Validates the LLM comparison; falls back to an explicit error comparison on malformed output."""
     try:
-        clean_json = response.strip()
-        if clean_json.startswith("```json"): clean_json = clean_json[7:]
-        if clean_json.endswith("```"): clean_json = clean_json[:-3]
-        
-        data = json.loads(clean_json)
-        return ComparisonOutput(**data)
+        return _COMPARISON_ADAPTER.validate_json(extract_json_payload(response))
     except Exception as e:
-        logger.error(f"Comparison LLM failed: {e}")
+        logger.error("Comparison LLM failed: %s", e)
         return ComparisonOutput(
             dimensions=input_data.dimensions,
             contrasts={d: {k: "Error generating contrast" for k in input_data.items} for d in input_data.dimensions},
@@ -1,10 +1,33 @@
+import atexit
+import copy
 import logging
 import sys
 import os
-from typing import Optional
+import asyncio
+import json
+import random
+import tempfile
+import time
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from typing import Any, Iterator, List, Optional, Tuple, Union
+from .json_utils import dumps_json, dumps_json_bytes, parse_json_stream, parse_llm_json
 
-def setup_logger(name: str = "research_agent", level: int = logging.INFO) -> logging.Logger:
-    """Configures and returns a standard logger for the agent."""
+__all__ = ["LLMClient", "setup_logger"]
+
+_FMT = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+@cache
+def setup_logger(name: str = "research_agent", level: Optional[int] = None) -> logging.Logger:
+    """
+    Configures and returns a standard logger for the agent.
+    Defaults to WARNING; override with the LOG_LEVEL env var (e.g. LOG_LEVEL=INFO).
+    Memoized per (name, level), so repeat calls return the configured logger directly.
+    """
+    if level is None:
+        level = os.environ.get("LOG_LEVEL", "WARNING").upper()
     logger = logging.getLogger(name)
     logger.setLevel(level)
     
@@ -12,20 +35,108 @@ def setup_logger(name: str = "research_agent", level: int = logging.INFO) -> log
     if not logger.handlers:
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setLevel(level)
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        console_handler.setFormatter(formatter)
+        console_handler.setFormatter(_FMT)
         logger.addHandler(console_handler)
         
     return logger
 
 logger = setup_logger("llm_client")
 
+OPENAI_MODEL = "gpt-4o"
+OPENAI_PREWARM_URL = "https://api.openai.com/v1/models"
+
+# Canned plan returned by the mock provider, serialized once at import
+_MOCK_DICT = {
+    "research_goal": "Mock Research Plan",
+    "assumptions": ["Mock Assumption"],
+    "steps": [
+        {"id": 1, "type": "research", "description": "Mock Step 1", "constraints": ["None"]},
+        {"id": 2, "type": "synthesize", "description": "Mock Synthesis", "inputs": [1]}
+    ],
+    "stop_conditions": {"max_steps": 5}
+}
+_MOCK_BYTES = dumps_json_bytes(_MOCK_DICT)
+_MOCK_JSON = _MOCK_BYTES.decode()
+
+_HTTP_CLIENT = None
+_HTTP_CLIENT_LOCK = threading.Lock()
+
+def _shared_http_client():
+    """
+    Returns the process-wide keep-alive pool, created on first use.
+    Sharing it across LLMClient instances means a new client reuses warm TCP/TLS connections.
+    """
+    global _HTTP_CLIENT
+    with _HTTP_CLIENT_LOCK:
+        if _HTTP_CLIENT is None:
+            # httpx ships with the openai SDK
+            import httpx
+            # Idle connections outlive the pause between UI interactions, so a rerun reuses them
+            limits = httpx.Limits(max_keepalive_connections=32, max_connections=100, keepalive_expiry=60.0)
+            # Fail fast on an unreachable host instead of waiting out the full read timeout
+            timeout = httpx.Timeout(60.0, connect=5.0)
+            try:
+                _HTTP_CLIENT = httpx.Client(http2=True, timeout=timeout, limits=limits)
+            except ImportError:
+                # HTTP/2 needs the optional `h2` package; keep-alive pooling still applies
+                _HTTP_CLIENT = httpx.Client(timeout=timeout, limits=limits)
+            atexit.register(_HTTP_CLIENT.close)
+            # Open the first connection in the background so the first real request skips the TCP/TLS handshake
+            threading.Thread(target=_prewarm, args=(_HTTP_CLIENT,), daemon=True).start()
+        return _HTTP_CLIENT
+
+def _prewarm(http_client):
+    try:
+        http_client.head(OPENAI_PREWARM_URL, timeout=5)
+    except Exception as e: # Best effort; the first real request just connects itself
+        logger.debug("Connection prewarm failed: %s", e)
+
+@cache
+def _google():
+    """Imports google.generativeai once per process; it is slow to load."""
+    import google.generativeai as genai
+    return genai
+
+@cache
+def _openai():
+    from openai import OpenAI
+    return OpenAI
+
+@cache
+def _rate_limit_errors(provider: str) -> tuple:
+    """Exception classes a provider SDK raises for HTTP 429 / quota exhaustion."""
+    try:
+        if provider == "google":
+            from google.api_core.exceptions import ResourceExhausted, TooManyRequests
+            return (ResourceExhausted, TooManyRequests)
+        if provider == "openai":
+            from openai import RateLimitError
+            return (RateLimitError,)
+    except ImportError:
+        pass
+    return ()
+
+def _backoff_delay(attempt: int, base_delay: float) -> float:
+    """Exponential backoff with up to 50% random jitter, so concurrent retries don't fire in lockstep."""
+    delay = base_delay * (2 ** attempt)
+    return delay + random.uniform(0, delay / 2)
+
 class LLMClient:
-    def __init__(self, provider: str = "auto", api_key: Optional[str] = None):
+    def __init__(self, provider: str = "auto", api_key: Optional[str] = None, cache: Optional[bool] = None,
+                 semantic_cache: bool = False, concurrency_limit: int = 8):
+        """
+        cache: persist responses on disk (see cache.DiskCache). Defaults to on when the
+        LLM_CACHE_DIR env var is set, so e.g. test runs reuse earlier responses.
+        """
         self.provider = provider
         self.api_key = api_key or os.environ.get("GOOGLE_API_KEY") or os.environ.get("OPENAI_API_KEY")
         self.client = None
-        
+        self._session = None # Process-wide pooled HTTP client, shared by every LLMClient
+        self.cache = None
+        self._local_batches = {} # Batch ID -> responses, for providers without a Batch API
+        # Caps in-flight provider requests across all threads sharing this client
+        self._semaphore = threading.BoundedSemaphore(concurrency_limit)
+
         if self.provider == "auto":
             if os.environ.get("GOOGLE_API_KEY"):
                 self.provider = "google"
@@ -37,10 +148,17 @@ class LLMClient:
 
         self._init_client()
 
+        # Mock responses are free and deterministic, so they are never cached
+        if cache is None:
+            cache = bool(os.environ.get("LLM_CACHE_DIR"))
+        if cache and self.provider != "mock":
+            from .cache import DiskCache
+            self.cache = DiskCache(namespace=self.provider, semantic=semantic_cache)
+
     def _init_client(self):
         try:
             if self.provider == "google":
-                import google.generativeai as genai
+                genai = _google()
                 if not self.api_key:
                      raise ValueError("Google API Key required")
                 genai.configure(api_key=self.api_key)
@@ -48,23 +166,117 @@ class LLMClient:
                 logger.info("Initialized Google Gemini Client (gemini-3-flash-preview)")
                 
             elif self.provider == "openai":
-                from openai import OpenAI
+                OpenAI = _openai()
                 if not self.api_key:
                     raise ValueError("OpenAI API Key required")
-                self.client = OpenAI(api_key=self.api_key)
+                self._session = _shared_http_client()
+                self.client = OpenAI(api_key=self.api_key, http_client=self._session)
                 logger.info("Initialized OpenAI Client")
                 
             elif self.provider == "mock":
                 logger.info("Initialized Mock Client")
                 
         except ImportError as e:
-            logger.error(f"Failed to import library for {self.provider}: {e}")
+            logger.error("Failed to import library for %s: %s", self.provider, e)
             self.provider = "mock"
         except Exception as e:
-            logger.error(f"Failed to initialize {self.provider}: {e}")
+            logger.error("Failed to initialize %s: %s", self.provider, e)
             self.provider = "mock"
 
-    def generate(self, system_prompt: str, user_prompt: str) -> str:
+    def close(self):
+        """Detaches from the shared connection pool, which stays open for other clients until exit."""
+        self._session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def generate(self, system_prompt: str, user_prompt: str, cache_key: Optional[str] = None) -> str:
+        """
+        cache_key: optional provider-side prompt cache key (OpenAI `prompt_cache_key`).
+        Requests sharing a key and a static prompt prefix are routed to the same
+        cache, so the prefix is tokenized once rather than on every call.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(system_prompt, user_prompt)
+            if cached is not None:
+                logger.info("Returning CACHED response")
+                return cached
+
+        with self._semaphore:
+            response = self._generate(system_prompt, user_prompt, cache_key)
+
+        if self.cache is not None and response and response != "{}": # "{}" signals a failed provider call
+            self.cache.put(system_prompt, user_prompt, response)
+        return response
+
+    def generate_json(self, system_prompt: str, user_prompt: str, cache_key: Optional[str] = None,
+                      stream: bool = False, roots: str = "{[") -> Any:
+        """
+        generate() followed by parse_llm_json(). The mock provider returns a copy of its
+        canned dict directly, skipping the serialize/parse round trip.
+
+        stream=True parses the response while it streams and returns as soon as the JSON
+        value is complete; provider errors fall back to the retrying generate() path.
+        roots restricts the streamed value's type (see parse_json_stream), e.g. "{" for an object.
+        Raises ValueError (json.JSONDecodeError) if the response is not valid JSON.
+        """
+        if self.provider == "mock":
+            logger.info("Returning MOCK response")
+            return copy.deepcopy(_MOCK_DICT)
+        if not stream:
+            return parse_llm_json(self.generate(system_prompt, user_prompt, cache_key))
+
+        if self.cache is not None:
+            cached = self.cache.get(system_prompt, user_prompt)
+            if cached is not None:
+                logger.info("Returning CACHED response")
+                return parse_llm_json(cached)
+
+        try:
+            with self._semaphore:
+                data = parse_json_stream(self.stream(system_prompt, user_prompt, cache_key), roots)
+        except ValueError:
+            raise
+        except Exception as e:
+            logger.warning("Streaming generation failed (%s); retrying without streaming.", e)
+            return parse_llm_json(self.generate(system_prompt, user_prompt, cache_key))
+
+        if self.cache is not None:
+            self.cache.put(system_prompt, user_prompt, dumps_json(data))
+        return data
+
+    def stream(self, system_prompt: str, user_prompt: str, cache_key: Optional[str] = None) -> Iterator[str]:
+        """Yields response text chunks as the provider generates them. Not cached, not retried."""
+        if self.provider == "google":
+            full_prompt = f"SYSTEM: {system_prompt}\n\nUSER: {user_prompt}"
+            for chunk in self.client.generate_content(full_prompt, stream=True):
+                yield chunk.text
+
+        elif self.provider == "openai":
+            response = self.client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                stream=True,
+                extra_body={"prompt_cache_key": cache_key} if cache_key else None
+            )
+            try:
+                for chunk in response:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                # Stopping early (JSON already complete) must still release the connection
+                response.close()
+
+        else: # Mock
+            yield self._mock_response(user_prompt)
+
+    def _generate(self, system_prompt: str, user_prompt: str, cache_key: Optional[str] = None) -> str:
         max_retries = 3
         base_delay = 2
 
@@ -75,14 +287,13 @@ class LLMClient:
                     response = self.client.generate_content(full_prompt)
                     return response.text
                 except Exception as e:
-                    if "429" in str(e) or "Quota exceeded" in str(e):
+                    if isinstance(e, _rate_limit_errors("google")):
                         if attempt < max_retries - 1:
-                            wait_time = base_delay * (2 ** attempt)
-                            logger.warning(f"Rate limit hit. Retrying in {wait_time}s...")
-                            import time
+                            wait_time = _backoff_delay(attempt, base_delay)
+                            logger.warning("Rate limit hit. Retrying in %.1fs...", wait_time)
                             time.sleep(wait_time)
                             continue
-                    logger.error(f"Google generation failed: {e}")
+                    logger.error("Google generation failed: %s", e)
                     return "{}"
             return "{}"
 
@@ -90,49 +301,128 @@ class LLMClient:
             for attempt in range(max_retries):
                 try:
                     response = self.client.chat.completions.create(
-                        model="gpt-4o",
+                        model=OPENAI_MODEL,
                         messages=[
                             {"role": "system", "content": system_prompt},
                             {"role": "user", "content": user_prompt}
-                        ]
+                        ],
+                        # Sent via extra_body so older openai SDKs without the named argument still work
+                        extra_body={"prompt_cache_key": cache_key} if cache_key else None
                     )
                     return response.choices[0].message.content
                 except Exception as e:
-                    if "429" in str(e) or "Rate limit" in str(e):
+                    if isinstance(e, _rate_limit_errors("openai")):
                         if attempt < max_retries - 1:
-                            wait_time = base_delay * (2 ** attempt)
-                            logger.warning(f"Rate limit hit. Retrying in {wait_time}s...")
-                            import time
+                            wait_time = _backoff_delay(attempt, base_delay)
+                            logger.warning("Rate limit hit. Retrying in %.1fs...", wait_time)
                             time.sleep(wait_time)
                             continue
-                    logger.error(f"OpenAI generation failed: {e}")
+                    logger.error("OpenAI generation failed: %s", e)
                     return "{}"
             return "{}"
 
         else: # Mock
             return self._mock_response(user_prompt)
 
+    def generate_many(self, prompts: List[Tuple[str, str]], max_workers: int = 8,
+                      cache_key: Optional[str] = None) -> List[str]:
+        """Generates responses for independent (system_prompt, user_prompt) pairs concurrently.
+
+        Results are returned in the same order as `prompts`.
+        """
+        if len(prompts) <= 1:
+            return [self.generate(system_prompt=sp, user_prompt=up, cache_key=cache_key) for sp, up in prompts]
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(prompts))) as pool:
+            return list(pool.map(lambda p: self.generate(system_prompt=p[0], user_prompt=p[1], cache_key=cache_key), prompts))
+
+    def submit_batch(self, prompts: List[Tuple[str, str]]) -> str:
+        """
+        Submits (system_prompt, user_prompt) pairs to the OpenAI Batch API and returns the batch ID.
+        Batches cost half as much and don't count against the synchronous rate limit, so they
+        suit offline sweeps where latency doesn't matter. Collect results with poll_batch.
+        Other providers (and mock) have no Batch API: the prompts run now via generate_many
+        and poll_batch returns the stored responses.
+        """
+        if self.provider != "openai":
+            batch_id = f"local-{uuid.uuid4().hex}"
+            self._local_batches[batch_id] = self.generate_many(prompts)
+            return batch_id
+
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as f:
+            for i, (system_prompt, user_prompt) in enumerate(prompts):
+                f.write(json.dumps({
+                    "custom_id": str(i),
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model": OPENAI_MODEL,
+                        "messages": [
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": user_prompt}
+                        ]
+                    }
+                }) + "\n")
+            path = f.name
+
+        try:
+            with open(path, "rb") as f:
+                batch_file = self.client.files.create(file=f, purpose="batch")
+        finally:
+            os.remove(path)
+
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        logger.info("Submitted batch %s with %s requests", batch.id, len(prompts))
+        return batch.id
+
+    def poll_batch(self, batch_id: str, interval: float = 30.0) -> List[str]:
+        """
+        Blocks until a batch from submit_batch finishes and returns its responses in
+        submission order. Failed requests yield "{}", like a failed generate call.
+        """
+        if batch_id in self._local_batches:
+            return self._local_batches.pop(batch_id)
+
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status == "completed":
+                break
+            if batch.status in ("failed", "expired", "cancelled"):
+                raise RuntimeError(f"Batch {batch_id} ended with status '{batch.status}'")
+            logger.info("Batch %s is %s; polling again in %ss", batch_id, batch.status, interval)
+            time.sleep(interval)
+
+        responses = ["{}"] * batch.request_counts.total
+        if batch.output_file_id:
+            for line in self.client.files.content(batch.output_file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                result = json.loads(line)
+                response = result.get("response") or {}
+                if response.get("status_code") == 200:
+                    responses[int(result["custom_id"])] = response["body"]["choices"][0]["message"]["content"]
+        return responses
+
+    async def agenerate(self, system_prompt: str, user_prompt: str, cache_key: Optional[str] = None) -> str:
+        """Awaitable generate; the blocking provider call runs in a worker thread so calls overlap."""
+        return await asyncio.to_thread(self.generate, system_prompt, user_prompt, cache_key)
+
+    async def agenerate_many(self, prompts: List[Tuple[str, str]], max_concurrency: int = 10,
+                             cache_key: Optional[str] = None) -> List[Union[str, BaseException]]:
+        """Async generate_many: results are in `prompts` order; a failed call yields its exception."""
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def _one(system_prompt: str, user_prompt: str) -> str:
+            async with semaphore:
+                return await self.agenerate(system_prompt, user_prompt, cache_key)
+
+        return await asyncio.gather(*[_one(sp, up) for sp, up in prompts], return_exceptions=True)
+
     def _mock_response(self, prompt: str) -> str:
         # Return a valid JSON based on simple keyword matching or just a default
         logger.info("Returning MOCK response")
-        return """
-        {
-            "research_goal": "Mock Research Plan",
-            "assumptions": ["Mock Assumption"],
-            "steps": [
-                {
-                    "id": 1,
-                    "type": "research",
-                    "description": "Mock Step 1",
-                    "constraints": ["None"]
-                },
-                {
-                    "id": 2,
-                    "type": "synthesize",
-                    "description": "Mock Synthesis",
-                    "inputs": [1]
-                }
-            ],
-            "stop_conditions": {"max_steps": 5}
-        }
-        """
+        return _MOCK_JSON
@@ -1,109 +1,203 @@
-from .schema import VerificationOutput, ResearchPlan, SynthesisOutput, FinalOutcome
+import hashlib
+from pydantic import TypeAdapter
+from .schema import VerificationOutput, ResearchPlan, SynthesisOutput, FinalOutcome, AuditResponse
 from .executor import ExecutionLog
 from .utils import LLMClient, setup_logger
-import json
+from .semantic_cache import SemanticCache
+from .json_utils import parse_llm_json
+from typing import Dict, FrozenSet, List, Tuple
 
 logger = setup_logger("verifier")
 
+# Invariant audit instructions and schema live in the system prompt, so every audit
+# request shares a byte-identical prefix that providers can serve from their prompt cache.
+AUDITOR_SYSTEM_PROMPT = """You are a strict Research Auditor. Output JSON only.
+
+VERIFY RESEARCH INTEGRITY of the SYNTHESIS against its GOAL.
+Are there unsupported claims? Is the confidence level appropriate?
+If the synthesis admits to knowing nothing or major key data is missing, recommend ABSTENTION.
+
+OUTPUT JSON:
+{
+    "overclaim_detected": bool,
+    "missing_assumptions": ["str"],
+    "required_disclaimers": ["str"],
+    "confidence_adjustment": "none" | "downgrade",
+    "recommend_abstain": bool,
+    "abstain_reason": "str or null"
+}
+"""
+AUDITOR_CACHE_KEY = "auditor-" + hashlib.md5(AUDITOR_SYSTEM_PROMPT.encode()).hexdigest()[:8]
+
+# Built once at import; verify() only fills the {goal} and {summary} slots
+_AUDIT_PROMPT = """GOAL: {goal}
+
+SYNTHESIS:
+{summary}"""
+
+# Built once; validates the LLM audit JSON against AuditResponse
+_AUDIT_ADAPTER = TypeAdapter(AuditResponse)
+_AUDIT_LIST_ADAPTER = TypeAdapter(List[AuditResponse])
+
+def check_coverage(plan: ResearchPlan, execution_log: ExecutionLog) -> Tuple[Dict[int, bool], FrozenSet[int]]:
+    """Rule-based coverage: Step ID -> whether it executed successfully, plus the executed IDs."""
+    executed_ids = frozenset(log['step_id'] for log in execution_log.log if log['status'] == 'success')
+    coverage = {step.id: step.id in executed_ids for step in plan.steps}
+    return coverage, executed_ids
+
+def decide_outcome(plan: ResearchPlan, coverage: Dict[int, bool], executed_ids: FrozenSet[int], audit: AuditResponse) -> VerificationOutput:
+    """Combines the rule-based coverage check with the LLM audit into the final report."""
+    coverage_fail_count = 0
+    for covered in coverage.values():
+        coverage_fail_count += not covered
+    all_covered = coverage_fail_count == 0
+
+    # --- ABSTENTION LOGIC ---
+    # We abstain if:
+    # 1. LLM recommends it explicitly
+    # 2. More than 50% of steps failed (Critical data loss)
+    # 3. Confidence is low AND overclaim is detected (High risk of hallucination)
+    
+    final_outcome = FinalOutcome.ANSWERED
+    abstention_reason = None
+    status = "pass"
+    
+    critical_failure = coverage_fail_count > (len(plan.steps) / 2)
+    
+    if audit.recommend_abstain:
+        final_outcome = FinalOutcome.ABSTAINED
+        abstention_reason = audit.abstain_reason or "Verifier recommended abstention due to content analysis."
+        status = "warn" # Abstention is a warning state in this UI, or handled separately
+    elif critical_failure:
+        final_outcome = FinalOutcome.ABSTAINED
+        abstention_reason = "Critical execution failure: Majority of research steps failed."
+        status = "fail"
+    elif not executed_ids:
+        final_outcome = FinalOutcome.ABSTAINED
+        abstention_reason = "Total execution failure: No steps completed."
+        status = "fail"
+        
+    # Downgrade logic if not abstaining
+    if final_outcome == FinalOutcome.ANSWERED:
+        if audit.overclaim_detected or not all_covered or audit.confidence_adjustment == "downgrade":
+            status = "warn"
+    
+    return VerificationOutput(
+        status=status,
+        final_outcome=final_outcome,
+        abstention_reason=abstention_reason,
+        coverage_check=coverage,
+        overclaim_detected=audit.overclaim_detected,
+        missing_assumptions=audit.missing_assumptions,
+        required_disclaimers=audit.required_disclaimers,
+        confidence_adjustment=audit.confidence_adjustment
+    )
+
+# Marks a VerificationOutput built by failed_verification rather than by an audit
+VERIFICATION_FAILED = "Verification process failed"
+
+def failed_verification(coverage: Dict[int, bool], error: Exception) -> VerificationOutput:
+    return VerificationOutput(
+        status="fail",
+        final_outcome=FinalOutcome.ABSTAINED,
+        abstention_reason=f"{VERIFICATION_FAILED}: {error}",
+        coverage_check=coverage,
+        overclaim_detected=True,
+        missing_assumptions=[VERIFICATION_FAILED],
+        required_disclaimers=["System integrity check failed"],
+        confidence_adjustment="downgrade"
+    )
+
 class Verifier:
-    def __init__(self, llm_client: LLMClient):
+    def __init__(self, llm_client: LLMClient, semantic_cache: bool = False, cache_threshold: float = 0.95):
         self.llm = llm_client
+        # Opt-in: paraphrased audit prompts reuse an earlier audit instead of calling the LLM.
+        # Only the LLM audit is cached; coverage is always recomputed from the execution log.
+        self.cache = None
+        if semantic_cache and llm_client.provider != "mock":
+            self.cache = SemanticCache(threshold=cache_threshold)
 
     def verify(self, plan: ResearchPlan, execution_log: ExecutionLog, synthesis: SynthesisOutput) -> VerificationOutput:
         logger.info("Running verification...")
         
         # 1. Coverage Check (Rule-based)
-        coverage = {}
-        executed_ids = set(log['step_id'] for log in execution_log.log if log['status'] == 'success')
-        for step in plan.steps:
-            coverage[step.id] = step.id in executed_ids
-            
-        all_covered = all(coverage.values())
-        coverage_fail_count = list(coverage.values()).count(False)
+        coverage, executed_ids = check_coverage(plan, execution_log)
         
         # 2. Epistemic Check (LLM-based)
-        prompt = f"""
-        VERIFY RESEARCH INTEGRITY
-        
-        GOAL: {plan.research_goal}
-        
-        SYNTHESIS:
-        {synthesis.directional_summary}
-        
-        Are there unsupported claims? Is the confidence level appropriate?
-        If the synthesis admits to knowing nothing or major key data is missing, recommend ABSTENTION.
-        
-        OUTPUT JSON:
-        {{
-            "overclaim_detected": bool,
-            "missing_assumptions": ["str"],
-            "required_disclaimers": ["str"],
-            "confidence_adjustment": "none" | "downgrade",
-            "recommend_abstain": bool,
-            "abstain_reason": "str or null"
-        }}
-        """
-        
-        response = self.llm.generate(system_prompt="You are a strict Research Auditor. Output JSON only.", user_prompt=prompt)
+        prompt = _AUDIT_PROMPT.format_map({"goal": plan.research_goal, "summary": synthesis.directional_summary})
         
+        audit = self.cache.query(prompt) if self.cache is not None else None
+        if audit is not None:
+            return decide_outcome(plan, coverage, executed_ids, audit)
+
         try:
-            clean_json = response.strip()
-            if clean_json.startswith("```json"): clean_json = clean_json[7:]
-            if clean_json.endswith("```"): clean_json = clean_json[:-3]
-            
-            data = json.loads(clean_json)
-            
-            # --- ABSTENTION LOGIC ---
-            # We abstain if:
-            # 1. LLM recommends it explicitly
-            # 2. More than 50% of steps failed (Critical data loss)
-            # 3. Confidence is low AND overclaim is detected (High risk of hallucination)
-            
-            final_outcome = FinalOutcome.ANSWERED
-            abstention_reason = None
-            status = "pass"
-            
-            recommend_abstain = data.get("recommend_abstain", False)
-            critical_failure = coverage_fail_count > (len(plan.steps) / 2)
-            
-            if recommend_abstain:
-                final_outcome = FinalOutcome.ABSTAINED
-                abstention_reason = data.get("abstain_reason", "Verifier recommended abstention due to content analysis.")
-                status = "warn" # Abstention is a warning state in this UI, or handled separately
-            elif critical_failure:
-                final_outcome = FinalOutcome.ABSTAINED
-                abstention_reason = "Critical execution failure: Majority of research steps failed."
-                status = "fail"
-            elif not executed_ids:
-                final_outcome = FinalOutcome.ABSTAINED
-                abstention_reason = "Total execution failure: No steps completed."
-                status = "fail"
-                
-            # Downgrade logic if not abstaining
-            if final_outcome == FinalOutcome.ANSWERED:
-                if data.get("overclaim_detected") or not all_covered or data.get("confidence_adjustment") == "downgrade":
-                    status = "warn"
-            
-            return VerificationOutput(
-                status=status,
-                final_outcome=final_outcome,
-                abstention_reason=abstention_reason,
-                coverage_check=coverage,
-                overclaim_detected=data.get("overclaim_detected", False),
-                missing_assumptions=data.get("missing_assumptions", []),
-                required_disclaimers=data.get("required_disclaimers", []),
-                confidence_adjustment=data.get("confidence_adjustment", "none")
-            )
+            # Streamed: the audit is parsed as soon as its closing brace arrives
+            data = self.llm.generate_json(system_prompt=AUDITOR_SYSTEM_PROMPT, user_prompt=prompt,
+                                          cache_key=AUDITOR_CACHE_KEY, stream=True, roots="{")
+            audit = _AUDIT_ADAPTER.validate_python(data)
+            verification = decide_outcome(plan, coverage, executed_ids, audit)
+            if self.cache is not None:
+                self.cache.add(prompt, audit)
+            return verification
             
         except Exception as e:
-            logger.error(f"Verification failed: {e}")
-            return VerificationOutput(
-                status="fail",
-                final_outcome=FinalOutcome.ABSTAINED,
-                abstention_reason=f"Verification process failed: {e}",
-                coverage_check=coverage,
-                overclaim_detected=True,
-                missing_assumptions=["Verification process failed"],
-                required_disclaimers=["System integrity check failed"],
-                confidence_adjustment="downgrade"
-            )
+            logger.error("Verification failed: %s", e)
+            return failed_verification(coverage, e)
+
+    def verify_offline(self, items: List[Tuple[ResearchPlan, ExecutionLog, SynthesisOutput]],
+                       interval: float = 30.0) -> List[VerificationOutput]:
+        """
+        Audits (plan, execution_log, synthesis) triples through the provider's Batch API
+        (LLMClient.submit_batch / poll_batch): half the cost and off the synchronous rate
+        limit, but results can take hours. For offline sweeps only. Results are in `items` order.
+        """
+        logger.info("Submitting %s audits as an offline batch...", len(items))
+        coverages = [check_coverage(plan, execution_log) for plan, execution_log, _ in items]
+        prompts = [
+            (AUDITOR_SYSTEM_PROMPT, _AUDIT_PROMPT.format_map({"goal": plan.research_goal, "summary": synthesis.directional_summary}))
+            for plan, _, synthesis in items
+        ]
+        responses = self.llm.poll_batch(self.llm.submit_batch(prompts), interval=interval)
+
+        results = []
+        for (plan, _, _), (coverage, executed_ids), response in zip(items, coverages, responses):
+            try:
+                audit = _AUDIT_ADAPTER.validate_python(parse_llm_json(response))
+                results.append(decide_outcome(plan, coverage, executed_ids, audit))
+            except Exception as e:
+                logger.error("Verification failed: %s", e)
+                results.append(failed_verification(coverage, e))
+        return results
+
+    def verify_batch(self, items: List[Tuple[ResearchPlan, ExecutionLog, SynthesisOutput]]) -> List[VerificationOutput]:
+        """
+        Audits several (plan, execution_log, synthesis) triples in one LLM call, saving
+        N-1 round trips. Results are in `items` order; if the batched response is not a
+        JSON array with one audit per item, every item is verified individually instead.
+        """
+        if len(items) <= 1:
+            return [self.verify(*item) for item in items]
+
+        logger.info("Running batched verification of %s items...", len(items))
+        coverages = [check_coverage(plan, execution_log) for plan, execution_log, _ in items]
+
+        sections = "\n\n".join(
+            f"ITEM {i}\n" + _AUDIT_PROMPT.format_map({"goal": plan.research_goal, "summary": synthesis.directional_summary})
+            for i, (plan, _, synthesis) in enumerate(items, 1)
+        )
+        prompt = f"""{len(items)} ITEMS TO AUDIT. Return a JSON array of exactly {len(items)} OUTPUT JSON objects, one per item in order.
+
+{sections}"""
+
+        try:
+            audits = self.llm.generate_json(system_prompt=AUDITOR_SYSTEM_PROMPT, user_prompt=prompt, cache_key=AUDITOR_CACHE_KEY)
+            audits = _AUDIT_LIST_ADAPTER.validate_python(audits)
+            if len(audits) != len(items):
+                raise ValueError(f"expected a JSON array of {len(items)} audits")
+            return [
+                decide_outcome(plan, coverage, executed_ids, audit)
+                for (plan, _, _), (coverage, executed_ids), audit in zip(items, coverages, audits)
+            ]
+        except Exception as e:
+            logger.warning("Batched verification unusable (%s); verifying items individually.", e)
+            return [self.verify(*item) for item in items]
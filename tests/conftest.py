@@ -0,0 +1,17 @@
+import os
+import shutil
+
+# Persist LLM responses across test runs so repeated runs hit disk, not the network.
+# Point LLM_CACHE_DIR elsewhere to override; pass --refresh-llm-cache to start clean.
+os.environ.setdefault(
+    "LLM_CACHE_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.pytest_cache', 'llm'))
+)
+
+def pytest_addoption(parser):
+    parser.addoption("--refresh-llm-cache", action="store_true",
+                     help="Discard cached LLM responses before running the tests")
+
+def pytest_configure(config):
+    if config.getoption("--refresh-llm-cache"):
+        shutil.rmtree(os.environ["LLM_CACHE_DIR"], ignore_errors=True)
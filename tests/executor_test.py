@@ -0,0 +1,43 @@
+import sys
+import os
+
+# Ensure we can import the package
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from research_agent.utils import LLMClient
+from research_agent.schema import ResearchPlan, ResearchStep
+from research_agent.executor import Executor
+
+def make_plan(*steps) -> ResearchPlan:
+    return ResearchPlan(
+        research_goal="Validation test",
+        assumptions=[],
+        steps=[ResearchStep(id=i, type=t, description=f"Step {i}", inputs=inputs) for i, t, inputs in steps]
+    )
+
+def test_validate_plan():
+    executor = Executor(LLMClient(provider="mock"))
+
+    # Forward references are allowed; order follows dependencies, not IDs
+    ok, order, deps = executor.validate_plan(make_plan(
+        (1, "compare", [2, 3]), (2, "research", None), (3, "research", None), (4, "synthesize", [1])
+    ))
+    assert ok
+    ids = [step.id for step in order]
+    assert ids.index(1) > ids.index(2) and ids.index(1) > ids.index(3)
+
+    # The synthesize barrier waits for every non-synthesize step, declared or not
+    assert ids[-1] == 4 and deps[4] == {1, 2, 3}
+
+    # Duplicate IDs, unknown inputs and real cycles are rejected
+    assert not executor.validate_plan(make_plan((1, "research", None), (1, "research", None)))[0]
+    assert not executor.validate_plan(make_plan((1, "compare", [9])))[0]
+    assert not executor.validate_plan(make_plan((1, "compare", [2]), (2, "compare", [1])))[0]
+
+    # A non-synthesize step cannot depend on a synthesize step
+    assert not executor.validate_plan(make_plan(
+        (1, "research", None), (2, "synthesize", [1]), (3, "compare", [1, 2])
+    ))[0]
+
+if __name__ == "__main__":
+    test_validate_plan()
@@ -0,0 +1,29 @@
+import sys
+import os
+
+# Ensure we can import the package
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from research_agent.gate import should_bypass
+from research_agent.schema import FinalOutcome
+
+def test_gate():
+    # Trivial / malformed queries short-circuit
+    for query in ["", "   ", "Is it good?"]:
+        decision = should_bypass(query)
+        print(f"'{query}' -> {decision}")
+        assert decision is not None and decision.final_outcome == FinalOutcome.ABSTAINED
+
+    # Arithmetic is answered directly
+    for query, answer in [("what is 2+2", "4"), ("12 * 3?", "36"), ("compute 7 / 2", "3.5")]:
+        decision = should_bypass(query)
+        print(f"'{query}' -> {decision}")
+        assert decision.final_outcome == FinalOutcome.ANSWERED and decision.answer == answer
+
+    assert should_bypass("what is 1/0").final_outcome == FinalOutcome.ABSTAINED
+
+    # Real research questions go through the full pipeline
+    assert should_bypass("Compare the battery life of iPhone 15 vs Pixel 8") is None
+
+if __name__ == "__main__":
+    test_gate()
@@ -0,0 +1,53 @@
+import sys
+import os
+
+# Ensure we can import the package
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from research_agent.json_utils import parse_llm_json, parse_json_stream
+
+def test_parse_llm_json():
+    # Fenced and bare responses parse the same
+    for text in ['{"n": 1}', '```json\n{"n": 1}\n```', '```JSON {"n": 1}```', '  ```\n{"n": 1}\n```\n']:
+        assert parse_llm_json(text) == {"n": 1}, text
+
+    # A fence inside a string value is part of the JSON, not a wrapper
+    text = '{"summary": "use ```json blocks``` in docs", "n": 1}'
+    assert parse_llm_json(text) == {"summary": "use ```json blocks``` in docs", "n": 1}
+    assert parse_llm_json(f"```json\n{text}\n```")["n"] == 1
+
+def test_parse_json_stream():
+    # Prose and fences around the value are skipped
+    assert parse_json_stream(['Sure! ```json\n{"n": 1}\n``` hope this helps']) == {"n": 1}
+
+    # A bracketed preamble wins by default; roots="{" requires an object
+    text = 'see [1] then {"overclaim_detected": false}'
+    assert parse_json_stream([text]) == [1]
+    assert parse_json_stream([text], roots="{") == {"overclaim_detected": False}
+
+    # Brackets and escaped quotes inside strings don't affect nesting
+    text = '{"s": "a } ] \\" [ {", "n": [1, {"x": "}"}]}'
+    expected = {"s": 'a } ] " [ {', "n": [1, {"x": "}"}]}
+    assert parse_json_stream([text]) == expected
+
+    # A value split across chunks, even mid-escape, parses the same
+    assert parse_json_stream(list(text)) == expected
+    assert parse_json_stream([text[:7], text[7:19], text[19:]]) == expected
+
+    # Returns once the value closes, without reading the rest of the stream
+    def chunks():
+        yield '{"n": 1} trailing'
+        raise AssertionError("read past the complete value")
+    assert parse_json_stream(chunks()) == {"n": 1}
+
+    # A stream that ends before the value closes raises
+    try:
+        parse_json_stream(['{"n": [1, 2'])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError for an unterminated value")
+
+if __name__ == "__main__":
+    test_parse_llm_json()
+    test_parse_json_stream()
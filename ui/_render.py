@@ -0,0 +1,55 @@
+import hashlib
+import html
+import reprlib
+from pathlib import Path
+
+import streamlit as st
+from research_agent.json_utils import dumps_json_indented
+
+@st.cache_data
+def load_css() -> str:
+    """Read from ui/style.css once per process instead of on every rerun."""
+    return Path(__file__).with_name("style.css").read_text()
+
+# Bounded repr for plain containers: the first few items, each string clipped
+_PREVIEW = reprlib.Repr()
+_PREVIEW.maxstring = _PREVIEW.maxother = 200
+_PREVIEW.maxdict = _PREVIEW.maxlist = 5
+_PLAIN = (dict, list, tuple, set, frozenset, int, float, bool, type(None))
+
+def _preview(obj, n: int = 200) -> str:
+    if isinstance(obj, str):
+        return obj[:n] # Plain text is shown as-is, without repr quoting
+    if hasattr(obj, "to_compact"):
+        obj = obj.to_compact() # Clipped projection; a model's own repr is built in full
+    if isinstance(obj, _PLAIN):
+        return _PREVIEW.repr(obj)[:n]
+    return f"<{type(obj).__name__}>"
+
+@st.cache_data(show_spinner=False)
+def plan_json(plan_dump: dict) -> str:
+    """Indented plan JSON for st.code; cheaper to render than the interactive st.json widget."""
+    return dumps_json_indented(plan_dump)
+
+def render_step(step, output, success: bool) -> str:
+    """One timeline row as HTML. Step output is escaped: it is LLM/tool text, not markup."""
+    if success:
+        return f"<div class='step-box'><b>Step {step.id} Completed</b><br/>Output: {html.escape(_preview(output))}...</div>"
+    return f"<div class='failure-box'><b>Step {step.id} Failed</b></div>"
+
+def render_plan_table(steps, statuses: dict) -> str:
+    """Markdown table of the planned steps with a status column (statuses: step ID -> icon)."""
+    lines = ["| Step | Type | Description | Status |", "|---|---|---|---|"]
+    for step in steps:
+        description = " ".join(step.description.split()).replace("|", "\\|")
+        lines.append(f"| {step.id} | {step.type} | {description} | {statuses[step.id]} |")
+    return "\n".join(lines)
+
+def log_digest(execution_log) -> str:
+    """Content hash of an execution log: step statuses plus each artifact's compact JSON."""
+    h = hashlib.blake2b(digest_size=16)
+    for entry in execution_log.log:
+        h.update(f"{entry['step_id']}:{entry['status']};".encode())
+    for step_id, blob in sorted(execution_log.serialized_artifacts().items()):
+        h.update(str(step_id).encode() + b"=" + blob)
+    return h.hexdigest()
@@ -2,7 +2,9 @@ import streamlit as st
 import sys
 import os
 import json
+import asyncio
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Ensure imports work
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -10,23 +12,83 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from research_agent.utils import LLMClient, setup_logger
 from research_agent.planner import Planner
 from research_agent.executor import Executor
-from research_agent.synthesizer import Synthesizer
-from research_agent.verifier import Verifier
-from research_agent.schema import ResearchPlan, ExecutionMode, FinalOutcome
+from research_agent.synthesizer import Synthesizer, failed_synthesis
+from research_agent.verifier import Verifier, VERIFICATION_FAILED
+from research_agent.schema import ResearchPlan, ExecutionMode, FinalOutcome, SynthesisOutput, VerificationOutput
+from ui._render import load_css, plan_json, render_step, render_plan_table, log_digest
 
 st.set_page_config(page_title="Agentic Research Assistant (V2)", layout="wide")
 
+@st.cache_resource
+def get_agents(provider: str, api_key: str = None):
+    """
+    Built once per (provider, api_key) and reused across reruns and sessions, so the
+    client's connection pool stays warm. The Executor is not cached: it holds per-run state.
+    """
+    client = LLMClient(provider=provider, api_key=api_key)
+    return client, Planner(client), Synthesizer(client), Verifier(client)
+
+# Fraction of research/compare steps that must finish before a speculative synthesis starts
+SPECULATE_AFTER = 0.5
+# Session state owned by the agent; Reset Agent drops only these
+AGENT_KEYS = ("agent", "show_verification_details")
+# The progress bar only advances in steps of this many percent (at most 100 / PROGRESS_TICK updates)
+PROGRESS_TICK = 5
+
+class NotCached(Exception):
+    """Carries a failure result out of a cached function; st.cache_data does not cache exceptions."""
+    def __init__(self, result: dict):
+        super().__init__("LLM call failed")
+        self.result = result
+
+def uncached_failure(fn, *args, **kwargs) -> dict:
+    """Calls a cached function, returning its failure result (not cached) if it raised NotCached."""
+    try:
+        return fn(*args, **kwargs)
+    except NotCached as e:
+        return e.result
+
+# Synthesis and verification outputs for identical inputs are reused for an hour; failures are
+# not, so a fixed API key takes effect on the next try. Cached values are plain dicts; models are
+# rebuilt at the call site. Underscored arguments are not part of the cache key. Plans need no
+# layer here: Planner memoizes successful plans per process.
+@st.cache_data(ttl=3600, show_spinner=False)
+def cached_synthesis(query: str, log_hash: str, provider: str, _api_key: str = None, _execution_log=None):
+    synthesis = get_agents(provider, _api_key)[2].synthesize(_execution_log, query)
+    if synthesis == failed_synthesis():
+        raise NotCached(synthesis.model_dump())
+    return synthesis.model_dump()
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def cached_verification(plan_json: str, log_hash: str, synthesis_json: str, provider: str,
+                        _api_key: str = None, _plan=None, _execution_log=None, _synthesis=None):
+    verification = get_agents(provider, _api_key)[3].verify(_plan, _execution_log, _synthesis)
+    if VERIFICATION_FAILED in verification.missing_assumptions:
+        raise NotCached(verification.model_dump())
+    return verification.model_dump()
+
+@st.fragment
+def verification_details(verification: VerificationOutput):
+    """
+    A fragment, so toggling the checkbox reruns only this block and not the whole run.
+    The expander body executes even when collapsed; the checkbox keeps the st.write
+    calls (slow on large coverage dicts) from running until asked for.
+    """
+    with st.expander("Verification Details"):
+        if st.checkbox("Show details", key="show_verification_details"):
+            st.write("Outcome:", verification.final_outcome.value)
+            st.write("Coverage:", verification.coverage_check)
+            st.write("Overclaims:", verification.overclaim_detected)
+            st.write("Missing Assumptions:", verification.missing_assumptions)
+
+@st.cache_data(show_spinner=False)
+def plan_schedule(plan_json: str, _executor: Executor):
+    """validate_plan once per distinct plan: (ok, step IDs in execution order, deps)."""
+    ok, order, deps = _executor.validate_plan(ResearchPlan.model_validate_json(plan_json))
+    return ok, [step.id for step in order], deps
+
 # Custom CSS for "Architecture" feel
-st.markdown("""
-<style>
-    .stExpander { border: 1px solid #ddd; border-radius: 5px; }
-    .step-box { padding: 10px; margin: 5px 0; border-left: 4px solid #4CAF50; background-color: #f9f9f9; color: black; }
-    .warning-box { padding: 10px; background-color: #fff3cd; border-left: 4px solid #ffc107; color: black; }
-    .failure-box { padding: 10px; background-color: #f8d7da; border-left: 4px solid #dc3545; color: black; }
-    .abstain-box { padding: 15px; background-color: #e2e3e5; border-left: 5px solid #6c757d; color: black; }
-    .stress-banner { background-color: #ffcccc; color: #cc0000; padding: 10px; text-align: center; font-weight: bold; border-radius: 5px; margin-bottom: 10px; }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(f"<style>{load_css()}</style>", unsafe_allow_html=True)
 
 st.title("Research Agent V2 (Stressed)")
 st.markdown("**System Status**: `Online` | **Architecture**: `V2 (Failure-Aware)`")
@@ -44,10 +106,15 @@ with st.sidebar:
 
     api_key = st.text_input("API Key (Google/OpenAI)", type="password", help="Leave empty to try auto-detect or mock")
     provider = st.selectbox("LLM Provider", ["auto", "google", "openai", "mock"])
+    max_parallel_agents = st.slider("Max Parallel Steps", 1, 8, 4, help="Independent plan steps run concurrently")
+    stream_output = st.checkbox("Stream step output", value=False,
+                                help="Show LLM output as it is generated; steps then run one at a time")
+    enable_ux_pause = st.checkbox("Pace step updates (demo)", value=False, help="Adds a 0.5s pause after each step")
     
     if st.button("Reset Agent"):
-        st.session_state.clear()
-        st.experimental_rerun()
+        for key in AGENT_KEYS:
+            st.session_state.pop(key, None)
+        st.rerun()
 
     with st.expander("ℹ️ Help & Documentation"):
         st.markdown("""
@@ -61,15 +128,8 @@ with st.sidebar:
         - **Abstention**: The agent can refuse to answer if data is insufficient.
         """)
 
-# Initialize session state
-if "execution_log" not in st.session_state:
-    st.session_state.execution_log = None
-if "plan" not in st.session_state:
-    st.session_state.plan = None
-if "synthesis" not in st.session_state:
-    st.session_state.synthesis = None
-if "verification" not in st.session_state:
-    st.session_state.verification = None
+# Initialize session state: one dict, so a rerun does a single lookup instead of four
+state = st.session_state.setdefault("agent", {"execution_log": [], "plan": None, "synthesis": None, "verification": None})
 
 # Main Input
 if execution_mode == ExecutionMode.STRESS_TEST:
@@ -78,21 +138,21 @@ if execution_mode == ExecutionMode.STRESS_TEST:
 query = st.text_area("Research Query", height=100, placeholder="e.g., Compare the economic impact of remote work vs office work in 2024")
 
 if st.button("Start Research"):
+    # Results from an earlier run must not leak into this one
+    state.update(execution_log=[], plan=None, synthesis=None, verification=None)
+    synthesis = None
     with st.spinner("Initializing Components..."):
         # Init components
-        client = LLMClient(provider=provider, api_key=api_key if api_key else None)
-        planner = Planner(client)
-        executor = Executor(client)
+        client = get_agents(provider, api_key if api_key else None)[0]
+        executor = Executor(client) # Fresh per run: holds this run's execution log
         executor.set_mode(execution_mode) # V2 Mode Set
-        synthesizer = Synthesizer(client)
-        verifier = Verifier(client)
         
     # 1. PLAN
     with st.status("Planning...", expanded=True) as status:
         st.write("Decomposing query into research steps...")
-        plan = planner.plan(query)
+        plan = get_agents(provider, api_key or None)[1].plan(query)
         if plan:
-            st.session_state.plan = plan
+            state["plan"] = plan
             st.write("Plan generated.")
             status.update(label="Planning Complete", state="complete")
         else:
@@ -101,55 +161,125 @@ if st.button("Start Research"):
             
     # Display Plan
     with st.expander("Research Plan", expanded=True):
-        st.json(plan.model_dump_json())
+        st.code(plan_json(plan.model_dump(mode='json')), language='json')
 
     # 2. EXECUTE
     st.subheader("Execution Timeline")
     execution_container = st.container()
+    partial_slot = st.empty()
+    # Speculative synthesis overlaps with the remaining steps; reused if it saw every artifact
+    speculation_pool = ThreadPoolExecutor(max_workers=1)
+    speculative = {"future": None, "covers": None, "shown": None}
     
     with st.status("Running Execution Loop...", expanded=True) as exec_status:
         execution_log = executor.execution_log
         
         # We manually iterate to show progress in UI
-        if not executor.validate_plan(plan):
+        plan_key = plan.model_dump_json() # Also keys the cached verification below
+        valid, order_ids, deps = plan_schedule(plan_key, executor)
+        steps_by_id = {step.id: step for step in plan.steps}
+        order = [steps_by_id[step_id] for step_id in order_ids]
+        if not valid:
+            speculation_pool.shutdown(wait=False)
             st.error("Plan Validation Failed")
             st.stop()
             
         progress_bar = st.progress(0)
-        total_steps = len(plan.steps)
-        
-        for i, step in enumerate(plan.steps):
-            st.write(f"**Step {step.id}**: {step.type} - _{step.description}_")
-            success = executor.execute_step(step)
-            
-            # Update artifacts display in real-time
+        total_steps = len(order)
+        # One table for the whole plan; a step's status cell flips as it finishes
+        status_table = st.empty()
+        statuses = {step.id: "⏳" for step in order}
+        status_table.markdown(render_plan_table(order, statuses))
+
+        # All rows render into one placeholder, replaced atomically as steps finish (in completion order)
+        timeline_slot = execution_container.empty()
+        rows = []
+        finished = []
+        shown_pct = [0] # Last percentage sent to the progress bar
+        # Log entries are appended to session state as each step lands, not copied wholesale at the end
+        state["execution_log"] = deltas = []
+        work_steps = sum(1 for step in order if step.type != "synthesize")
+
+        def speculative_synthesis(snapshot) -> SynthesisOutput:
+            # Through the memo, keyed like the final synthesis: a repeated run makes no LLM call here
+            return SynthesisOutput.model_validate(uncached_failure(
+                cached_synthesis, query, log_digest(snapshot), provider, api_key or None, _execution_log=snapshot))
+
+        def speculate():
+            future = speculative["future"]
+            if future is not None and future.done() and speculative["shown"] is not future:
+                speculative["shown"] = future
+                if future.result() != failed_synthesis():
+                    partial_slot.info(f"Preliminary synthesis: {future.result().directional_summary}")
+            if future is not None and not future.done():
+                return # One speculation at a time; the next completion re-checks
+            snapshot = executor.execution_log.snapshot()
+            covers = frozenset(snapshot.serialized_artifacts())
+            if len(covers) >= max(1, work_steps * SPECULATE_AFTER) and covers != speculative["covers"]:
+                speculative["covers"] = covers
+                speculative["future"] = speculation_pool.submit(speculative_synthesis, snapshot)
+
+        def on_step_done(step, success):
+            # Runs on the script thread (the event loop's), so Streamlit calls are safe here
+            finished.append(step.id)
+            deltas.extend(executor.execution_log.log[len(deltas):])
+            statuses[step.id] = "✅" if success else "❌"
+            status_table.markdown(render_plan_table(order, statuses))
+            if not (stream_output and success): # Streamed steps already show their output
+                rows.append(render_step(step, executor.execution_log.artifacts.get(step.id), success))
+                timeline_slot.markdown("".join(rows), unsafe_allow_html=True)
+            if not success:
+                exec_status.update(state="error")
+            pct = 100 * len(finished) // total_steps
+            if pct - shown_pct[0] >= PROGRESS_TICK or len(finished) == total_steps:
+                shown_pct[0] = pct
+                progress_bar.progress(pct / 100)
             if success:
-                 entry = executor.execution_log.log[-1]
-                 with execution_container:
-                     st.markdown(f"<div class='step-box'><b>Step {step.id} Completed</b><br/>Output: {str(entry['output'])[:200]}...</div>", unsafe_allow_html=True)
-            else:
-                 st.error(f"Step {step.id} Failed")
-                 exec_status.update(state="error")
-                 break
-            
-            progress_bar.progress((i + 1) / total_steps)
-            time.sleep(0.5) # UX pause
+                speculate()
+            if enable_ux_pause:
+                time.sleep(0.5) # Opt-in visual pacing only
+
+        if stream_output:
+            # Sequential, but each step's output is rendered token by token as it is generated
+            for step in order:
+                with execution_container:
+                    st.write_stream(executor.stream_step(step))
+                success = step.id in executor.execution_log.artifacts
+                on_step_done(step, success)
+                if not success:
+                    break
+        else:
+            # One dependency wave at a time; each wave's LLM prompts go out as a single batch
+            asyncio.run(executor.arun(plan, max_parallel=max_parallel_agents, on_step_done=on_step_done, batched=True,
+                                      schedule=(valid, order, deps)))
             
-        st.session_state.execution_log = executor.execution_log
+        deltas.extend(executor.execution_log.log[len(deltas):]) # Entries logged without a step callback
         exec_status.update(label="Execution Complete", state="complete")
 
     # 3. SYNTHESIZE
-    if st.session_state.execution_log:
+    if state["execution_log"]:
         with st.status("Synthesizing...", expanded=True) as synth_status:
-            synthesis = synthesizer.synthesize(executor.execution_log, query)
-            st.session_state.synthesis = synthesis
+            log_hash = log_digest(executor.execution_log)
+            final_covers = frozenset(executor.execution_log.serialized_artifacts())
+            synthesis = None
+            if speculative["future"] is not None and speculative["covers"] == final_covers:
+                # The speculative run already saw every artifact; no second LLM call unless it failed
+                synthesis = speculative["future"].result()
+            if synthesis is None or synthesis == failed_synthesis():
+                synthesis = SynthesisOutput.model_validate(uncached_failure(
+                    cached_synthesis, query, log_hash, provider, api_key or None, _execution_log=executor.execution_log))
+            speculation_pool.shutdown(wait=False)
+            partial_slot.empty()
+            state["synthesis"] = synthesis
             synth_status.update(label="Synthesis Complete", state="complete")
 
     # 4. VERIFY & DISPLAY
-    if st.session_state.synthesis:
+    if synthesis:
         with st.spinner("Verifying..."):
-            verification = verifier.verify(plan, executor.execution_log, synthesis)
-            st.session_state.verification = verification
+            verification = VerificationOutput.model_validate(uncached_failure(
+                cached_verification, plan_key, log_hash, synthesis.model_dump_json(), provider, api_key or None,
+                _plan=plan, _execution_log=executor.execution_log, _synthesis=synthesis))
+            state["verification"] = verification
             
         st.subheader("Verification Report")
         
@@ -186,11 +316,7 @@ if st.button("Start Research"):
                 for q in synthesis.open_questions:
                     st.markdown(f"- {q}")
             
-        with st.expander("Verification Details"):
-            st.write("Outcome:", verification.final_outcome.value)
-            st.write("Coverage:", verification.coverage_check)
-            st.write("Overclaims:", verification.overclaim_detected)
-            st.write("Missing Assumptions:", verification.missing_assumptions)
+        verification_details(verification)
 
 st.markdown("---")
 st.caption("Multi-Step Research Agent V2 | Built by Aditya Kumar Singh")